@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the taskset generators
+
+Usage:
+    benchmark_generators                [options]
+
+Options:
+    --ntask=LIST, -n LIST               comma separated numbers of tasks in one taskset  [default: 10,20,50,100,200,500,1000]
+    --nset=N, -s N                      number of tasksets generated per measurement  [default: 1000]
+    --utilization=N, -u N               system utilization in percent  [default: 50]
+    --repeat=N, -r N                    number of measurements, the best one is reported  [default: 3]
+    --version, -v                       show version and exit
+    --help, -h                          show this message
+"""
+import time
+
+import lib.generator_UUNIFAST as uunifast
+import lib.randfixedsum as randfixedsum
+
+from docopt import docopt
+
+
+def measure(function, repeat):
+    """Return the best wall-clock time of `repeat` calls of `function`."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_uunifast(n_tasks, n_sets, utilization, repeat):
+    """Compare UUniFast batch arrays with task object creation."""
+    print("UUniFast (log-uniform periods in [1, 100])")
+    print("%8s %18s %18s" % ('ntask', 'arrays [sets/s]', 'objects [sets/s]'))
+    for n in n_tasks:
+        batch_time = measure(lambda: uunifast.gen_tasksets_batch(
+            n, n_sets, 1, 100, utilization), repeat)
+        objects_time = measure(lambda: uunifast.gen_tasksets(
+            n, n_sets, 1, 100, utilization), repeat)
+        print("%8d %18.0f %18.0f" % (n, n_sets / batch_time, n_sets / objects_time))
+
+
+def benchmark_randfixedsum(n_tasks, utilization, repeat, calls=20):
+    """Compare one-set StaffordRandFixedSum calls with and without the
+    cached transition tables."""
+    print("StaffordRandFixedSum (one set per call)")
+    print("%8s %18s %18s" % ('ntask', 'cold [sets/s]', 'cached [sets/s]'))
+
+    def cold():
+        for _ in range(calls):
+            randfixedsum._transition_table.cache_clear()
+            randfixedsum.StaffordRandFixedSum(n, utilization, 1)
+
+    def cached():
+        for _ in range(calls):
+            randfixedsum.StaffordRandFixedSum(n, utilization, 1)
+
+    for n in n_tasks:
+        cold_time = measure(cold, repeat)
+        cached_time = measure(cached, repeat)
+        print("%8d %18.0f %18.0f" % (n, calls / cold_time, calls / cached_time))
+
+
+def main():
+    args = docopt(__doc__, version='0.1')
+    n_tasks = [int(n) for n in args['--ntask'].split(',')]
+    n_sets = int(args['--nset'])
+    utilization = float(args['--utilization']) / 100.0
+    repeat = int(args['--repeat'])
+
+    benchmark_uunifast(n_tasks, n_sets, utilization, repeat)
+    benchmark_randfixedsum(n_tasks, utilization, repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Reference checks of the schedulability analyses of lib/rta.py, lib/edf.py
+and lib/global_tests.py on random small task sets (periods from a small
+set of values, so the hyperperiods stay short)
+
+Usage:
+    check_analyses                      [options]
+
+Options:
+    --nset=N, -s N                      number of random task sets per check  [default: 3000]
+    --ntask=N, -n N                     maximal number of tasks in one taskset  [default: 5]
+    --npe=N, -p N                       number of processors of the global simulation  [default: 2]
+    --runs=N, -r N                      simulated arrival patterns per task set in the global simulation  [default: 3]
+    --seed=N                            seed of the random task sets  [default: 0]
+    --version, -v                       show version and exit
+    --help, -h                          show this message
+"""
+import heapq
+import sys
+
+import numpy as np
+import lib.rta as rta
+import lib.edf as edf
+import lib.global_tests as global_tests
+import lib.hyperperiod as hyperperiods
+from lib.task_array import TaskSetArray
+from lib.job_set import RATE_MONOTONIC, DEADLINE_MONOTONIC, EDF
+
+from docopt import docopt
+
+PERIODS = [2, 3, 4, 5, 6, 8, 10, 12, 15, 20, 24, 30]
+
+
+def random_sets(rng, n_sets, max_tasks, max_utilization):
+    """Random task sets with constrained deadlines; half of them with
+    release jitter. Returns a TaskSetArray (one PE)."""
+    columns = {'period': [], 'wcet': [], 'deadline': [], 'jitter': []}
+    offsets = [0]
+    for k in range(n_sets):
+        n = int(rng.integers(1, max_tasks + 1))
+        period = rng.choice(PERIODS, n)
+        utilization = rng.dirichlet(np.ones(n)) * rng.uniform(0.2, max_utilization)
+        wcet = np.clip(np.rint(utilization * period), 1, period).astype(np.int64)
+        if k % 2:
+            jitter = rng.integers(0, period // 4 + 1)
+            jitter = np.where(wcet + jitter <= period, jitter, 0)
+        else:
+            jitter = np.zeros(n, dtype=np.int64)
+        deadline = rng.integers(wcet + jitter, period + 1)
+        for name, values in (('period', period), ('wcet', wcet),
+                             ('deadline', deadline), ('jitter', jitter)):
+            columns[name].append(values)
+        offsets.append(offsets[-1] + n)
+    return TaskSetArray(offsets=offsets, **{name: np.concatenate(values)
+                                             for name, values in columns.items()})
+
+
+def task_set(task_sets, k):
+    """Columns (C, T, D, J) of set k as lists."""
+    rows = slice(int(task_sets.offsets[k]), int(task_sets.offsets[k + 1]))
+    return (task_sets.wcet[rows].tolist(), task_sets.period[rows].tolist(),
+            task_sets.deadline[rows].tolist(), task_sets.jitter[rows].tolist())
+
+
+def priority_order(T, D, method):
+    """Tasks from the highest priority (ties in task order)."""
+    key = T if method == RATE_MONOTONIC else D
+    return sorted(range(len(T)), key=lambda i: (key[i], i))
+
+
+def critical_instant(C, T, D, J, hp, k):
+    """Response time of task k, simulated from its critical instant under
+    preemptive FP: the first jobs of the higher priority tasks hp arrive
+    with task k as late as their jitter allows, the next ones as early as
+    possible. D[k] + 1 if the job misses its deadline."""
+    pending = {k: C[k]}
+    for t in range(D[k] - J[k]):
+        for j in hp:
+            if t == 0 or (t + J[j]) % T[j] == 0:
+                pending[j] = pending.get(j, 0) + C[j]
+        running = next(i for i in hp + [k] if pending.get(i))
+        pending[running] -= 1
+        if not pending[k]:
+            return J[k] + t + 1
+    return D[k] + 1
+
+
+def simulate_non_preemptive(C, T, D, J, method, jitter_mode):
+    """Largest response time of each task in a simulation of non-preemptive
+    FP on one processor over two hyperperiods. All tasks release their
+    first job at 0 (synchronous release) and the jobs arrive jitter_mode
+    ('none' or 'max') after their release; the response time is measured
+    from the release."""
+    horizon = 2 * hyperperiods.hyperperiod(T)
+    rank = {i: r for r, i in enumerate(priority_order(T, D, method))}
+    # (arrival, release, task)
+    jobs = sorted((release + (J[i] if jitter_mode == 'max' else 0), release, i)
+                  for i in range(len(C)) for release in range(0, horizon, T[i]))
+    worst = [0] * len(C)
+    ready = []
+    arrived = 0
+    t = 0
+    while arrived < len(jobs) or ready:
+        if not ready:
+            t = max(t, jobs[arrived][0])
+        while arrived < len(jobs) and jobs[arrived][0] <= t:
+            _, release, i = jobs[arrived]
+            heapq.heappush(ready, (rank[i], release, i))
+            arrived += 1
+        # The job runs to completion.
+        _, release, i = heapq.heappop(ready)
+        t += C[i]
+        worst[i] = max(worst[i], t - release)
+    return worst
+
+
+def edf_reference(C, T, D, J):
+    """Whether the demand bound function stays at most t at every t up to
+    H + max(D) (and U <= 1), the exact test of preemptive EDF."""
+    h = hyperperiods.hyperperiod(T)
+    if sum(c * (h // p) for c, p in zip(C, T)) > h:
+        return False
+    for t in range(1, h + max(D) + 1):
+        demand = sum(max(0, (t - d + j) // p + 1) * c
+                     for c, p, d, j in zip(C, T, D, J))
+        if demand > t:
+            return False
+    return True
+
+
+def simulate_global(C, T, D, J, method, n_pe, rng, jitter_mode):
+    """Whether a discrete-time simulation of global preemptive FP or EDF on
+    n_pe processors meets all deadlines over two hyperperiods. The jobs
+    arrive jitter_mode ('none', 'max' or 'random') after their release."""
+    horizon = 2 * hyperperiods.hyperperiod(T)
+    rank = {i: r for r, i in enumerate(priority_order(T, D, method))}
+    jobs = []
+    for i in range(len(C)):
+        for release in range(0, horizon, T[i]):
+            if jitter_mode == 'none':
+                delay = 0
+            elif jitter_mode == 'max':
+                delay = J[i]
+            else:
+                delay = int(rng.integers(0, J[i] + 1))
+            key = (release + D[i], i, release) if method == EDF else (rank[i], release)
+            # [arrival, absolute deadline, remaining execution, priority]
+            jobs.append([release + delay, release + D[i], C[i], key])
+    jobs.sort()
+    arrived = 0
+    ready = []
+    for t in range(horizon + max(D)):
+        while arrived < len(jobs) and jobs[arrived][0] <= t:
+            ready.append(jobs[arrived])
+            arrived += 1
+        ready.sort(key=lambda job: job[3])
+        for job in ready[:n_pe]:
+            job[2] -= 1
+        ready = [job for job in ready if job[2]]
+        if any(job[1] <= t + 1 for job in ready):
+            return False
+    return True
+
+
+def reference_response_times(task_sets, method):
+    """Response times of all tasks from critical_instant (preemptive), in
+    the row order of task_sets."""
+    response = []
+    for k in range(len(task_sets)):
+        C, T, D, J = task_set(task_sets, k)
+        order = priority_order(T, D, method)
+        for i in range(len(C)):
+            response.append(critical_instant(C, T, D, J, order[:order.index(i)], i))
+    return np.array(response, dtype=np.int64)
+
+
+def check_fixed_priority(task_sets, references):
+    """lib.rta (preemptive) against the reference response times. Past the
+    deadline only the miss is compared (both stop iterating there)."""
+    mismatches = 0
+    for method, expected in references.items():
+        got = rta.response_times(task_sets, method, True)
+        late = expected > task_sets.deadline
+        mismatches += int(np.sum(np.where(late, got <= task_sets.deadline, got != expected)))
+    print("Fixed-priority RTA (RM, DM; preemptive): %d tasks, %d mismatches"
+          % (task_sets.n_tasks * len(references), mismatches))
+    return mismatches
+
+
+def check_non_preemptive(task_sets):
+    """The non-preemptive response times of lib.rta that meet the deadline
+    are never exceeded in the simulation (no jitter and maximal jitter)."""
+    exceeded = 0
+    checked = 0
+    for method in (RATE_MONOTONIC, DEADLINE_MONOTONIC):
+        got = rta.response_times(task_sets, method, False)
+        for k in range(len(task_sets)):
+            C, T, D, J = task_set(task_sets, k)
+            bound = got[task_sets.offsets[k]:task_sets.offsets[k + 1]].tolist()
+            worst = [max(r) for r in zip(*(simulate_non_preemptive(C, T, D, J, method, mode)
+                                            for mode in ('none', 'max')))]
+            for i in range(len(C)):
+                if bound[i] <= D[i]:
+                    exceeded += worst[i] > bound[i]
+                    checked += 1
+    print("Non-preemptive RTA (RM, DM): %d schedulable tasks simulated, %d response times above the bound"
+          % (checked, exceeded))
+    return exceeded
+
+
+def check_edf(task_sets, exact):
+    """lib.edf against the demand bound function at every t."""
+    mismatches = int(np.sum(edf.schedulable(task_sets) != exact))
+    print("EDF demand-bound test (QPA): %d task sets, %d mismatches"
+          % (len(task_sets), mismatches))
+    return mismatches
+
+
+def check_global_uniprocessor(task_sets, exact):
+    """On one processor, the labels of lib.global_tests must not contradict
+    the exact tests."""
+    contradictions = 0
+    for method in (RATE_MONOTONIC, DEADLINE_MONOTONIC, EDF):
+        labels = global_tests.classify(task_sets, 1, method)
+        contradictions += int(np.sum((labels == global_tests.SCHEDULABLE) & ~exact[method]))
+        contradictions += int(np.sum((labels == global_tests.UNSCHEDULABLE) & exact[method]))
+    print("Global tests on one processor (RM, DM, EDF): %d task sets, %d contradictions"
+          % (len(task_sets), contradictions))
+    return contradictions
+
+
+def check_global_simulation(task_sets, n_pe, runs, rng):
+    """The sets labeled schedulable by lib.global_tests never miss a deadline
+    in the simulation (no jitter, maximal jitter and random jitter)."""
+    misses = 0
+    checked = 0
+    for method in (RATE_MONOTONIC, DEADLINE_MONOTONIC, EDF):
+        labels = global_tests.classify(task_sets, n_pe, method)
+        for k in np.flatnonzero(labels == global_tests.SCHEDULABLE).tolist():
+            C, T, D, J = task_set(task_sets, k)
+            modes = ['none', 'max'] + ['random'] * max(0, runs - 2)
+            misses += not all(simulate_global(C, T, D, J, method, n_pe, rng, mode)
+                              for mode in modes)
+            checked += 1
+    print("Global tests on %d processors (RM, DM, EDF): %d schedulable task sets simulated, %d deadline misses"
+          % (n_pe, checked, misses))
+    return misses
+
+
+def main():
+    args = docopt(__doc__, version='0.1')
+    n_sets = int(args['--nset'])
+    n_tasks = int(args['--ntask'])
+    n_pe = int(args['--npe'])
+    rng = np.random.default_rng(int(args['--seed']))
+
+    uniprocessor = random_sets(rng, n_sets, n_tasks, 1.2)
+    references = {method: reference_response_times(uniprocessor, method)
+                  for method in (RATE_MONOTONIC, DEADLINE_MONOTONIC)}
+    # Exact uniprocessor tests: the critical instant of preemptive FP and
+    # the demand bound function of EDF.
+    sets = uniprocessor.set_index()
+    exact = {method: np.bincount(sets, weights=references[method] > uniprocessor.deadline,
+                                 minlength=len(uniprocessor)) == 0
+             for method in (RATE_MONOTONIC, DEADLINE_MONOTONIC)}
+    exact[EDF] = np.array([edf_reference(*task_set(uniprocessor, k))
+                           for k in range(len(uniprocessor))])
+    errors = check_fixed_priority(uniprocessor, references)
+    errors += check_non_preemptive(uniprocessor)
+    errors += check_edf(uniprocessor, exact[EDF])
+    errors += check_global_uniprocessor(uniprocessor, exact)
+    multiprocessor = random_sets(rng, n_sets, n_tasks + n_pe, 0.9 * n_pe)
+    errors += check_global_simulation(multiprocessor, n_pe, int(args['--runs']), rng)
+    if errors:
+        print("ERROR: the analyses do not match the reference checks")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -66,24 +66,12 @@ mkdir -p ./jobsets
 i=0
 while [ $i -lt $n_tasksets ]; do
     echo "Generating taskset $i"
-    # generate taskset and jobset until the number of jobs is less than the limit
-    while true; do
-      python3 task_generator.py -s 1 -u $utilization -g $algorithm -p $cores -n $n_tasks
-      # run for 1 minute max
-      exit_code=$(timeout 1m python3 priority_generator.py -t ./taskset-0.csv -m $priority -s)
-      if [[ $exit_code -eq 124 ]]; then
-        echo "[!] job set generation timeout"
-        continue
-      fi
-      #python3 priority_generator.py -t ./taskset-0.csv -m $priority -s
-      # count number of line in the jobset file
-      n_jobs=$(wc -l < ./jobset-taskset-0.csv)
-      if [ $n_jobs -lt $n_jobs_limit ]; then
-        break
-      else
-        echo "[!] too many jobs, regenerating task set"
-      fi
-    done    
+    # the task generator draws the task set again until its job set has
+    # less than n_jobs_limit lines (header included)
+    until python3 task_generator.py -s 1 -u $utilization -g $algorithm -p $cores -n $n_tasks --max-jobs $((n_jobs_limit - 2)); do
+      echo "[!] too many jobs, regenerating task set"
+    done
+    python3 priority_generator.py -t ./taskset-0.csv -m $priority -s
      mv taskset-*.csv ./tasksets/taskset-$i.csv
      mv jobset-*.csv ./jobsets/jobset-taskset-$i.csv
      i=$((i+1))
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Processor-demand test of preemptive EDF on each PE of many task sets.
+With release jitter J_i (the 'Arrival max.' - 'Arrival min.' of the
+jobs), a job must finish D_i - J_i after its latest arrival, so the demand
+bound function is
+    h(t) = sum_i max(0, floor((t - D_i + J_i) / T_i) + 1) C_i
+and a PE is schedulable iff U <= 1 and h(t) <= t at every absolute
+deadline t < L. L is the smaller of the bound of Spuri (1996) and
+H + max(D_i), with H the hyperperiod of lib.hyperperiod (the one used by
+priority_generator.cal_hyperperiod). The deadlines are walked backwards
+with QPA (Zhang and Burns, "Schedulability analysis for real-time systems
+with EDF scheduling", 2009), for all PEs of all sets at once.
+"""
+import numpy as np
+import lib.hyperperiod as hyperperiods
+from lib.rta import as_task_array, group_tables
+
+# Checkpoints beyond this bound are handled with Python integers.
+int64_bound = 2 ** 62
+# QPA steps before a PE is given up on (reported as not schedulable); only
+# reached with a utilization of (almost) exactly 1 and a long hyperperiod.
+max_steps = 100000
+
+
+def demand_bound(t, C, T, deadline, valid):
+    """h(t) of each group (row) of the padded tables at the times t."""
+    jobs = (t[:, None] - deadline) // T + 1
+    return np.sum(np.where(valid & (jobs > 0), jobs * C, 0), axis=1)
+
+
+def last_deadline(t, T, deadline, valid, strict):
+    """Largest absolute deadline before t (strict) or at most t, of each
+    group; -1 if there is none."""
+    shift = 1 if strict else 0
+    k = (t[:, None] - deadline - shift) // T
+    d = np.where(valid & (k >= 0), k * T + deadline, -1)
+    return np.max(d, axis=1)
+
+
+def check_bounds(C, T, deadline, valid):
+    """Length L of the interval to check for each group, the groups that
+    are already unschedulable (U > 1, or no time before a deadline) and
+    the groups that are schedulable without QPA (U <= 1 and D_i - J_i >= T_i
+    for all tasks).
+    """
+    bounds = []
+    late = []
+    easy = []
+    for c, p, d in zip(C.tolist(), T.tolist(), (deadline * valid).tolist()):
+        tasks = [(ci, pi, di) for ci, pi, di in zip(c, p, d) if ci]
+        # Exact U > 1 with integers: sum(C_i H / T_i) > H.
+        h = hyperperiods.hyperperiod(pi for _, pi, _ in tasks)
+        load = sum(ci * (h // pi) for ci, pi, _ in tasks)
+        max_deadline = max(di for _, _, di in tasks)
+        bound = h + max_deadline
+        if load < h:
+            # Spuri: sum_i (T_i - D_i) U_i / (1 - U), in integers (times H)
+            # so that a U that rounds to 1 in floats still gives a bound.
+            spuri = -(-sum((pi - di) * ci * (h // pi) for ci, pi, di in tasks)
+                      // (h - load))
+            bound = min(bound, max(max_deadline, spuri))
+        bounds.append(bound)
+        late.append(load > h or min(di for _, _, di in tasks) <= 0)
+        easy.append(all(di >= pi for _, pi, di in tasks))
+    return bounds, np.array(late, dtype=bool), np.array(easy, dtype=bool)
+
+
+def qpa(C, T, deadline, valid, bound):
+    """QPA on padded tables; returns whether each group is schedulable
+    (False for the groups still open after max_steps steps)."""
+    t = last_deadline(bound, T, deadline, valid, strict=False)
+    d_min = np.min(np.where(valid, deadline, np.max(deadline) + 1), axis=1)
+    h = demand_bound(t, C, T, deadline, valid)
+    active = np.flatnonzero((h <= t) & (h > d_min))
+    steps = 0
+    while active.size and steps < max_steps:
+        steps += 1
+        Ta, Da, Va = T[active], deadline[active], valid[active]
+        ta, ha = t[active], h[active]
+        ta = np.where(ha < ta, ha, last_deadline(ta, Ta, Da, Va, strict=True))
+        ha = demand_bound(ta, C[active], Ta, Da, Va)
+        t[active], h[active] = ta, ha
+        active = active[(ha <= ta) & (ha > d_min[active])]
+    schedulable = h <= d_min
+    schedulable[active] = False
+    return schedulable
+
+
+def schedulable(task_sets):
+    """Whether each task set is schedulable by preemptive EDF on each of
+    its PEs (one bool per set); unmapped sets run on PE 0. A PE whose
+    test needs more than max_steps QPA steps counts as not schedulable.
+    task_sets: a TaskSetArray with integer columns, or lists of tasks
+    """
+    task_sets = as_task_array(task_sets)
+    if not task_sets.n_tasks:
+        return np.ones(len(task_sets), dtype=bool)
+    tables, order, group, position, valid = group_tables(task_sets)
+    C, T = tables['wcet'], tables['period']
+    # Deadline after the latest arrival of a job.
+    deadline = tables['deadline'] - tables['jitter']
+    bounds, late, easy = check_bounds(C, T, deadline, valid)
+    ok = ~late
+    # Groups with long check intervals use Python integers.
+    large = np.array([b >= int64_bound for b in bounds], dtype=bool)
+    test = ok & ~easy
+    for rows, dtype in ((test & ~large, np.int64), (test & large, object)):
+        if rows.any():
+            bound = np.array(bounds, dtype=object)[rows].astype(dtype)
+            ok[rows] = qpa(C[rows].astype(dtype), T[rows].astype(dtype),
+                           deadline[rows].astype(dtype), valid[rows], bound)
+    group_set = np.zeros(C.shape[0], dtype=np.int64)
+    group_set[group] = task_sets.set_index()[order]
+    return np.bincount(group_set, weights=~ok, minlength=len(task_sets)) == 0
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Task set generation with per-task utilization bounds.
+Utilizations are drawn uniformly among the vectors with the required total
+utilization and lower <= u_i <= upper (Dirichlet-rescale style sampler
+RandFixedSumBounded), periods as in the Emberson et al. generator.
+"""
+from lib.generator_Emberson import gen_periods
+from lib.randfixedsum import RandFixedSumBounded
+from lib.task_array import TaskSetArray
+import numpy
+
+
+def gen_taskset_array(n, u, nsets, permin, permax, gran, dist, round_C,
+                      lower=0.0, upper=1.0, rng=None, max_hyperperiod=None):
+    """
+    n: size of taskset (number of tasks in each taskset)
+    u: total taskset utilisation
+    nsets: number of tasksets
+    permin: minimum period value
+    permax: maximum period value
+    gran: period granularity
+    dist: choose period distribution to be 'unif' or 'logunif'
+    round_C: round execution times to nearest integer
+    lower: minimum utilisation of a task (number or one value per task)
+    upper: maximum utilisation of a task (number or one value per task)
+    rng: random streams of the sets (lib.rng, default: global state)
+    max_hyperperiod: if given, bound of the hyperperiod of each taskset
+    Returns a TaskSetArray (float columns).
+    """
+    x = RandFixedSumBounded(n, u, nsets, lower, upper, rng=rng)
+    periods = gen_periods(n, nsets, permin, permax, gran, dist, rng,
+                          max_hyperperiod)
+    C = x * periods
+    if round_C:
+        C = numpy.round(C, decimals=0)
+    return TaskSetArray(period=numpy.trunc(periods), wcet=numpy.trunc(C),
+                        dtype=numpy.float64)
+
+
+def gen_tasksets(n, u, nsets, permin, permax, gran, dist, round_C,
+                 lower=0.0, upper=1.0, rng=None, max_hyperperiod=None):
+    """Same as gen_taskset_array, but return lists of task objects."""
+    return gen_taskset_array(n, u, nsets, permin, permax, gran, dist,
+                             round_C, lower, upper, rng, max_hyperperiod).to_tasksets()
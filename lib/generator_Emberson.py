@@ -34,76 +34,31 @@ any questions regarding this software.
 """
 
 from lib.task import task
+from lib.task_array import TaskSetArray
+from lib.randfixedsum import StaffordRandFixedSum
+from lib.rng import streams
+from lib.periods import generate_periods_bounded
 import numpy
 
-def StaffordRandFixedSum(n, u, nsets):
 
-    #deal with n=1 case
-    if n == 1:
-        return numpy.tile(numpy.array([u]),[nsets,1])
-    
-    k = numpy.floor(u)
-    s = u
-    step = 1 if k < (k-n+1) else -1
-    s1 = s - numpy.arange( k, (k-n+1)+step, step )
-    step = 1 if (k+n) < (k-n+1) else -1
-    s2 = numpy.arange( (k+n), (k+1)+step, step ) - s
-
-    tiny = numpy.finfo(float).tiny
-    huge = numpy.finfo(float).max
-
-    w = numpy.zeros((n, n+1))
-    w[0,1] = huge
-    t = numpy.zeros((n-1,n))
-
-    for i in numpy.arange(2, (n+1)):
-        tmp1 = w[i-2, numpy.arange(1,(i+1))] * s1[numpy.arange(0,i)]/float(i)
-        tmp2 = w[i-2, numpy.arange(0,i)] * s2[numpy.arange((n-i),n)]/float(i)
-        w[i-1, numpy.arange(1,(i+1))] = tmp1 + tmp2;
-        tmp3 = w[i-1, numpy.arange(1,(i+1))] + tiny;
-        tmp4 = numpy.array( (s2[numpy.arange((n-i),n)] > s1[numpy.arange(0,i)]) )
-        t[i-2, numpy.arange(0,i)] = (tmp2 / tmp3) * tmp4 + (1 - tmp1/tmp3) * (numpy.logical_not(tmp4))
-
-    m = nsets
-    x = numpy.zeros((n,m))
-    rt = numpy.random.uniform(size=(n-1,m)) #rand simplex type
-    rs = numpy.random.uniform(size=(n-1,m)) #rand position in simplex
-    s = numpy.repeat(s, m);
-    j = numpy.repeat(int(k+1), m);
-    sm = numpy.repeat(0, m);
-    pr = numpy.repeat(1, m);
-
-    for i in numpy.arange(n-1,0,-1): #iterate through dimensions
-        e = ( rt[(n-i)-1,...] <= t[i-1,j-1] ) #decide which direction to move in this dimension (1 or 0)
-        sx = rs[(n-i)-1,...] ** (1/float(i)) #next simplex coord
-        sm = sm + (1-sx) * pr * s/float(i+1)
-        pr = sx * pr
-        x[(n-i)-1,...] = sm + pr * e
-        s = s - e
-        j = j - e #change transition table column if required
-
-    x[n-1,...] = sm + pr * s
-    
-    #iterated in fixed dimension order but needs to be randomised
-    #permute x row order within each column
-    for i in range(0,m):
-        x[...,i] = x[numpy.random.permutation(n),i]
-
-    return numpy.transpose(x);
-
-def gen_periods(n, nsets, min, max, gran, dist):
+def gen_periods(n, nsets, min, max, gran, dist, rng=None, max_hyperperiod=None):
 
+    if max_hyperperiod is not None:
+        # divisors of one hyperperiod <= max_hyperperiod, close to log-uniform
+        return generate_periods_bounded(n, nsets, min, max, max_hyperperiod, gran, rng)
+    rng = streams(rng)
     if dist == "logunif":
-        periods = numpy.exp(numpy.random.uniform(low=numpy.log(min), high=numpy.log(max+gran), size=(nsets,n)))
+        periods = numpy.exp(rng.uniform(low=numpy.log(min), high=numpy.log(max+gran), size=(nsets,n)))
     elif dist == "unif":
-        periods = numpy.random.uniform(low=min, high=(max+gran), size=(nsets,n))
+        periods = rng.uniform(low=min, high=(max+gran), size=(nsets,n))
     else:
         return None
     periods = numpy.floor(periods / gran) * gran
 
     return periods
 
-def gen_tasksets(n, u, nsets, permin, permax, gran, dist,round_C):
+def gen_tasksets(n, u, nsets, permin, permax, gran, dist,round_C, rng=None,
+                 max_hyperperiod=None):
     """
     n: size of taskset (number of tasks in each taskset)
     u: total taskset utilisation
@@ -113,9 +68,12 @@ def gen_tasksets(n, u, nsets, permin, permax, gran, dist,round_C):
     gran: period granularity
     dist: choose period distribution to be 'unif' or 'logunif'
     round_C: round execution times to nearest integer
+    rng: random streams of the sets (lib.rng, default: global state)
+    max_hyperperiod: if given, bound of the hyperperiod of each taskset
+                     (periods from lib.periods instead of dist)
     """
-    x = StaffordRandFixedSum(n, u, nsets)
-    periods = gen_periods(n, nsets, permin, permax, gran, dist)
+    x = StaffordRandFixedSum(n, u, nsets, rng)
+    periods = gen_periods(n, nsets, permin, permax, gran, dist, rng, max_hyperperiod)
     #iterate through each row (which represents utils for a taskset)
     tasksets=[]
     for i in range(numpy.size(x, axis=0)):
@@ -129,4 +87,19 @@ def gen_tasksets(n, u, nsets, permin, permax, gran, dist,round_C):
             temp_task=task(wcet=int(temp[t][3]),period=int(temp[t][2]),deadline=int(temp[t][2]))
             taskset.append(temp_task)
         tasksets.append (taskset)
-    return tasksets
\ No newline at end of file
+    return tasksets
+
+
+def gen_taskset_array(n, u, nsets, permin, permax, gran, dist, round_C,
+                      rng=None, max_hyperperiod=None):
+    """Same as gen_tasksets, but return a TaskSetArray (float columns)
+    instead of creating one task object per task.
+    """
+    x = StaffordRandFixedSum(n, u, nsets, rng)
+    periods = gen_periods(n, nsets, permin, permax, gran, dist, rng, max_hyperperiod)
+    C = x * periods
+    if round_C:
+        C = numpy.round(C, decimals=0)
+    # Truncate to integers like gen_tasksets does.
+    return TaskSetArray(period=numpy.trunc(periods), wcet=numpy.trunc(C),
+                        dtype=numpy.float64)
@@ -4,12 +4,15 @@ From the paper: 'Measuring the performance of schedulability tests.' (2005).
 This part adapted from https://github.com/tu-dortmund-ls12-rt/end-to-end
 """
 from lib.task import task
+from lib.task_array import TaskSetArray
 import numpy as np
-import random
+from lib.rng import streams
+from lib.periods import generate_periods_bounded
+from lib.randfixedsum import RandFixedSumLarge
 
 
 def gen_tasksets(num_tasks, num_tasksets, min_period, max_period, utilization,
-                 rounded=False):
+                 rounded=False, rng=None):
     """Generate task sets.
     Variables:
     num_tasks: number of tasks per set
@@ -18,24 +21,124 @@ def gen_tasksets(num_tasks, num_tasksets, min_period, max_period, utilization,
     max_period: maximal period
     utilization: desired utilization
     rounded: flag to round periods to integers
+    rng: random streams of the sets (lib.rng, default: global state)
     """
-    # Create periods.
-    tasksets_periods = generate_periods_loguniform(
-            num_tasks, num_tasksets, min_period, max_period, rounded)
-    # Create utilizations.
-    tasksets_utilizations = generate_utilizations_uniform(
-            num_tasks, num_tasksets, utilization)
+    # Create periods and utilizations.
+    tasksets_periods, tasksets_utilizations = gen_tasksets_batch(
+            num_tasks, num_tasksets, min_period, max_period, utilization,
+            rounded, rng)
     # Create tasksets by matching both of the above.
-    tasksets = []
-    for i in range(num_tasksets):
-        taskset = []
-        for j in range(num_tasks):
-            t = task(wcet = (tasksets_periods[i][j]* tasksets_utilizations[i][j]),
-                    period= tasksets_periods[i][j],
-                    deadline= tasksets_periods[i][j])
-            taskset.append(t)
-        tasksets.append(taskset)
+    return arrays_to_tasksets(tasksets_periods, tasksets_utilizations)
+
+
+def gen_tasksets_batch(num_tasks, num_tasksets, min_period, max_period,
+                       utilization, rounded=False, rng=None,
+                       max_hyperperiod=None):
+    """Generate task sets as arrays, without creating task objects.
+    Variables:
+    num_tasks: number of tasks per set
+    num_tasksets: number of sets
+    min_period: minimal period
+    max_period: maximal period
+    utilization: desired utilization
+    rounded: flag to round periods to integers
+    rng: random streams of the sets (lib.rng, default: global state)
+    max_hyperperiod: if given, the periods are drawn with
+                     lib.periods.generate_periods_bounded so that the
+                     hyperperiod of each set is at most max_hyperperiod
+    Returns a (periods, utilizations) pair of numpy arrays with shape
+    (num_tasksets, num_tasks); row i describes task set i.
+    """
+    tasksets_periods = generate_periods(
+            num_tasks, num_tasksets, min_period, max_period, rounded, rng,
+            max_hyperperiod)
+    tasksets_utilizations = generate_utilizations_uniform_batch(
+            num_tasks, num_tasksets, utilization, rng)
+    return tasksets_periods, tasksets_utilizations
+
 
+def gen_taskset_array(num_tasks, num_tasksets, min_period, max_period,
+                      utilization, rounded=False, rng=None,
+                      max_hyperperiod=None):
+    """Generate task sets as a TaskSetArray (float columns).
+    Variables: see gen_tasksets_batch.
+    """
+    periods, utilizations = gen_tasksets_batch(
+            num_tasks, num_tasksets, min_period, max_period, utilization,
+            rounded, rng, max_hyperperiod)
+    return TaskSetArray(period=periods, wcet=periods * utilizations,
+                        dtype=np.float64)
+
+
+def gen_taskset_array_discard(num_tasks, num_tasksets, min_period, max_period,
+                              utilization, rounded=False,
+                              max_task_utilization=1.0, rng=None,
+                              max_hyperperiod=None):
+    """Generate task sets with UUNIFAST-Discard as a TaskSetArray.
+    Variables: see gen_tasksets_batch; max_task_utilization is the largest
+    allowed utilization of a single task.
+    Returns the TaskSetArray and the acceptance rate of the discard step.
+    """
+    periods = generate_periods(
+            num_tasks, num_tasksets, min_period, max_period, rounded, rng,
+            max_hyperperiod)
+    utilizations, acceptance_rate = generate_utilizations_uniform_discard(
+            num_tasks, num_tasksets, utilization, max_task_utilization,
+            rng=rng)
+    return TaskSetArray(period=periods, wcet=periods * utilizations,
+                        dtype=np.float64), acceptance_rate
+
+
+def gen_taskset_array_partitioned(num_tasks, num_tasksets, num_pe, min_period,
+                                  max_period, utilization, rounded=False,
+                                  rng=None, max_hyperperiod=None):
+    """Generate task sets that are already mapped onto num_pe PEs.
+    The utilization of each set is split over the PEs with
+    RandFixedSumLarge (at most 1 per PE), the tasks are spread evenly over
+    the PEs (the first PEs get one more if needed) and the tasks of each PE
+    get its utilization with UUNIFAST. No set is thrown away. The PE loads
+    are at most 1 before scaling (see floor_wcet of lib.transformer).
+    Variables: see gen_tasksets_batch; num_pe is the number of PEs.
+    Returns a TaskSetArray (float columns) with the pe column set.
+    """
+    if num_tasks < num_pe:
+        raise ValueError("%d tasks cannot be spread over %d PEs" % (num_tasks, num_pe))
+    pe_utilizations = RandFixedSumLarge(num_pe, utilization, num_tasksets,
+                                        cap=1.0, rng=rng)
+    counts = np.full(num_pe, num_tasks // num_pe)
+    counts[:num_tasks % num_pe] += 1
+    # One row of UUNIFAST draws per set; PE p uses counts[p] - 1 of them.
+    draws = streams(rng).random((num_tasksets, num_tasks - num_pe))
+    utilizations = np.empty((num_tasksets, num_tasks))
+    task_start = np.concatenate(([0], np.cumsum(counts)))
+    draw_start = task_start - np.arange(num_pe + 1)
+    # At most two group sizes: all PEs of one size are drawn at once.
+    for size in np.unique(counts).tolist():
+        pes = np.flatnonzero(counts == size)
+        columns = (draw_start[pes, None] + np.arange(size - 1)).ravel()
+        tasks = (task_start[pes, None] + np.arange(size)).ravel()
+        utilizations[:, tasks] = uunifast_from_draws(
+                draws[:, columns].reshape(num_tasksets * pes.size, size - 1),
+                pe_utilizations[:, pes].ravel()).reshape(num_tasksets, -1)
+    periods = generate_periods(
+            num_tasks, num_tasksets, min_period, max_period, rounded, rng,
+            max_hyperperiod)
+    pe = np.tile(np.repeat(np.arange(num_pe), counts), (num_tasksets, 1))
+    return TaskSetArray(period=periods, wcet=periods * utilizations, pe=pe,
+                        dtype=np.float64)
+
+
+def arrays_to_tasksets(tasksets_periods, tasksets_utilizations):
+    """Create task objects from period and utilization arrays.
+    Variables:
+    tasksets_periods: periods, one row per task set
+    tasksets_utilizations: utilizations, one row per task set
+    """
+    tasksets = []
+    for periods, utilizations in zip(np.asarray(tasksets_periods).tolist(),
+                                     np.asarray(tasksets_utilizations).tolist()):
+        tasksets.append([task(wcet=p * u, period=p, deadline=p)
+                         for p, u in zip(periods, utilizations)])
     return tasksets
 
 
@@ -56,20 +159,10 @@ def gen_tasksets_pred(num_tasks, num_tasksets, min_period, max_period,
     tasksets_periods = generate_periods_loguniform_discrete(
             num_tasks, num_tasksets, min_period, max_period, round_down_set)
     # Create utilizations.
-    tasksets_utilizations = generate_utilizations_uniform(
+    tasksets_utilizations = generate_utilizations_uniform_batch(
             num_tasks, num_tasksets, utilization)
     # Creating tasksets by matching both of the above.
-    tasksets = []
-    for i in range(num_tasksets):
-        taskset = []
-        for j in range(num_tasks):
-            t = task(wcet=(tasksets_periods[i][j]* tasksets_utilizations[i][j]),
-                    period= tasksets_periods[i][j],
-                    deadline= tasksets_periods[i][j])
-            taskset.append(t)
-        tasksets.append(taskset)
-
-    return tasksets
+    return arrays_to_tasksets(tasksets_periods, tasksets_utilizations)
 
 
 # help functions
@@ -84,16 +177,44 @@ def generate_periods_loguniform(num_tasks, num_tasksets, min_period,
     max_period: maximal period
     rounded: flag to round periods to integers
     """
+    periods = generate_periods_loguniform_batch(
+            num_tasks, num_tasksets, min_period, max_period, rounded)
+    # Make list out of them
+    return periods.tolist()
+
+
+def generate_periods(num_tasks, num_tasksets, min_period, max_period,
+                     rounded=False, rng=None, max_hyperperiod=None):
+    """Log-uniform periods, with a bounded hyperperiod if max_hyperperiod
+    is given (see gen_tasksets_batch)."""
+    if max_hyperperiod is not None:
+        return generate_periods_bounded(
+                num_tasks, num_tasksets, min_period, max_period,
+                max_hyperperiod, rng=rng)
+    return generate_periods_loguniform_batch(
+            num_tasks, num_tasksets, min_period, max_period, rounded, rng)
+
+
+def generate_periods_loguniform_batch(num_tasks, num_tasksets, min_period,
+                                      max_period, rounded=False, rng=None):
+    """Generate log-uniformly distributed periods as a numpy array.
+    Variables:
+    num_tasks: number of tasks per set
+    num_tasksets: number of sets
+    min_period: minimal period
+    max_period: maximal period
+    rounded: flag to round periods to integers
+    rng: random streams of the sets (lib.rng, default: global state)
+    """
     # Create random periods.
-    periods = np.exp(np.random.uniform(
+    periods = np.exp(streams(rng).uniform(
             low=np.log(min_period),
             high=np.log(max_period),
             size=(num_tasksets, num_tasks)))
-    # Make list out of them
     if rounded:  # round periods to nearest integer
-        return np.rint(periods).tolist()
+        return np.rint(periods)
     else:
-        return periods.tolist()
+        return periods
 
 
 def generate_periods_uniform(num_tasks, num_tasksets, min_period,
@@ -125,24 +246,95 @@ def generate_utilizations_uniform(num_tasks, num_tasksets, utilization):
     num_tasksets: number of sets
     utilization: desired utilization in (0,1]
     """
-    def uunifast(num_tasks, utilization):
-        """UUNIFAST utilization pulling."""
-        utilizations = []
-        cumulative_utilization = utilization
-        for i in range(1, num_tasks):
-            # Randomly set next utilization.
-            cumulative_utilization_next = (
-                    cumulative_utilization
-                    * random.random() ** (1.0/(num_tasks-i)))
-            utilizations.append(
-                    cumulative_utilization - cumulative_utilization_next)
-            # Compute remaining utilization.
-            cumulative_utilization = cumulative_utilization_next
-        utilizations.append(cumulative_utilization_next)
-        # Return list of utilizations.
-        return utilizations
     # Return one list of utilizations for each task set.
-    return [uunifast(num_tasks, utilization) for i in range(num_tasksets)]
+    return generate_utilizations_uniform_batch(
+            num_tasks, num_tasksets, utilization).tolist()
+
+
+def generate_utilizations_uniform_batch(num_tasks, num_tasksets, utilization,
+                                        rng=None):
+    """Generate utilizations with UUNIFAST for all task sets at once.
+    Variables:
+    num_tasks: number of tasks per set
+    num_tasksets: number of sets
+    utilization: desired utilization in (0,1]
+    rng: random streams of the sets (lib.rng, default: global state)
+    Returns a (num_tasksets, num_tasks) numpy array.
+    """
+    draws = streams(rng).random((num_tasksets, num_tasks - 1))
+    return uunifast_from_draws(draws, utilization)
+
+
+def uunifast_from_draws(draws, utilization):
+    """UUNIFAST utilizations from uniform draws.
+    Variables:
+    draws: uniform numbers in [0,1), one row of num_tasks-1 per task set
+    utilization: desired utilization, a number or one value per row
+    Returns a (number of rows, num_tasks) numpy array.
+    """
+    num_tasksets, num_tasks = draws.shape[0], draws.shape[1] + 1
+    utilization = np.asarray(utilization, dtype=float)
+    # Remaining utilization before drawing task i (column i); the last
+    # column stays 0 so that the last task takes what is left.
+    cumulative_utilization = np.zeros((num_tasksets, num_tasks + 1))
+    cumulative_utilization[:, 0] = utilization
+    # UUNIFAST pulls the i-th remaining utilization with exponent
+    # 1/(num_tasks-i), so all draws of all sets are done in one step.
+    exponents = 1.0 / np.arange(num_tasks - 1, 0, -1)
+    cumulative_utilization[:, 1:num_tasks] = utilization.reshape(-1, 1) * np.cumprod(
+            draws ** exponents, axis=1)
+    return cumulative_utilization[:, :-1] - cumulative_utilization[:, 1:]
+
+
+def generate_utilizations_uniform_discard(num_tasks, num_tasksets,
+                                          utilization,
+                                          max_task_utilization=1.0,
+                                          max_block_size=10**7, rng=None):
+    """Generate utilizations with UUNIFAST-Discard for utilization > 1.
+    Variables:
+    num_tasks: number of tasks per set
+    num_tasksets: number of sets
+    utilization: desired utilization, may be larger than 1
+    max_task_utilization: sets with a larger task utilization are discarded
+    max_block_size: maximal number of values drawn in one block
+    rng: random streams of the sets (lib.rng, default: global state)
+    Candidate matrices are drawn in blocks, invalid rows are removed in a
+    vectorized way and only the missing sets are drawn again. Each missing
+    set draws the same number of candidates from its own stream (doubled
+    in every round), so the accepted row of a set does not depend on the
+    other sets.
+    Returns the (num_tasksets, num_tasks) array and the acceptance rate.
+    """
+    if utilization > num_tasks * max_task_utilization:
+        raise ValueError("Utilization %g cannot be split into %d tasks of at most %g"
+                         % (utilization, num_tasks, max_task_utilization))
+    rng = streams(rng)
+    utilizations = np.empty((num_tasksets, num_tasks))
+    missing = np.arange(num_tasksets)
+    drawn = 0
+    accepted = 0
+    per_set = 1
+    max_per_set = max(1, max_block_size // num_tasks)
+    while missing.size:
+        chunk = max(1, max_block_size // (per_set * num_tasks))
+        still_missing = []
+        for start in range(0, missing.size, chunk):
+            sets = missing[start:start + chunk]
+            draws = rng.subset(sets).random(
+                    (sets.size, per_set * (num_tasks - 1)))
+            candidates = uunifast_from_draws(
+                    draws.reshape(sets.size * per_set, num_tasks - 1),
+                    utilization).reshape(sets.size, per_set, num_tasks)
+            valid = np.all(candidates <= max_task_utilization, axis=2)
+            drawn += valid.size
+            accepted += int(valid.sum())
+            found = valid.any(axis=1)
+            first = valid.argmax(axis=1)
+            utilizations[sets[found]] = candidates[found, first[found]]
+            still_missing.append(sets[~found])
+        missing = np.concatenate(still_missing)
+        per_set = min(2 * per_set, max_per_set)
+    return utilizations, accepted / drawn if drawn else 1.0
 
 
 def generate_periods_loguniform_discrete(num_tasks, num_tasksets, min_period,
@@ -3,220 +3,263 @@
 From the paper: 'Real world automotive benchmark for free' (WATERS 2015).
 This part adapted from https://github.com/tu-dortmund-ls12-rt/end-to-end
 """
-from scipy import stats
-from scipy.stats import exponweib
 from lib.task import task
+from lib.rng import streams
 import numpy as np
-import random
 
 
 ###
 # Task set generation.
 ###
-def sample_runnable_acet(period, amount=1, scalingFlag=False):
+
+# Runnable periods of the WATERS benchmark.
+PERIODS = [1, 2, 5, 10, 20, 50, 100, 200, 1000]
+
+# Parameters from WATERS 'Real World Automotive Benchmarks For Free' for
+# each period: (scaling fmin, scaling fmax, Weibull shape, Weibull scale,
+# ACET min, ACET max). For period 1000 there is no Weibull since the range
+# from 0.37 to 0.46 is too short to be modeled by weibull properly; ACETs
+# are uniform in the range instead.
+RUNNABLE_PROFILES = {
+    1: (1.3, 29.11, 1.044, 1.0/0.214, 0.34, 30.11),
+    2: (1.54, 19.04, 1.0607440083, 1.0/0.2479463059, 0.32, 40.69),
+    5: (1.13, 18.44, 1.00818633, 1.0/0.09, 0.36, 83.38),
+    10: (1.06, 30.03, 1.0098, 1.0/0.0985, 0.21, 309.87),
+    20: (1.06, 15.61, 1.01309699673984310, 1.0/0.1138186679, 0.25, 291.42),
+    50: (1.13, 7.76, 1.00324219159296302, 1.0/0.05685450460, 0.29, 92.98),
+    100: (1.02, 8.88, 1.00900736028318527, 1.0/0.09448019812, 0.21, 420.43),
+    200: (1.03, 4.9, 1.15710612360723798, 1.0/0.3706045664, 0.22, 21.95),
+    1000: (1.84, 4.75, None, None, 0.37, 0.46),
+}
+
+# RUNNABLE_PROFILES as one array per parameter, in the order of PERIODS
+# (NaN: no Weibull).
+_PROFILE_COLUMNS = np.array(
+    [[np.nan if value is None else value for value in RUNNABLE_PROFILES[p]]
+     for p in PERIODS]).T
+
+
+def sample_truncated_weibull(shape, scale, low, high, amount=1, rng=None):
+    """Sample a Weibull distribution truncated to [low, high].
+    The samples are drawn through the inverse CDF restricted to the range,
+    so no sample has to be rejected and pulled again.
+    """
+    return truncated_weibull_from_draws(
+        streams(rng).uniform(size=amount), shape, scale, low, high)
+
+
+def truncated_weibull_from_draws(draws, shape, scale, low, high):
+    """Inverse CDF of the Weibull distribution truncated to [low, high],
+    applied to uniform draws in [0, 1). The parameters may be arrays of
+    the shape of draws."""
+    cdf_low = -np.expm1(-(low / scale) ** shape)
+    cdf_high = -np.expm1(-(high / scale) ** shape)
+    p = cdf_low + (cdf_high - cdf_low) * draws
+    samples = scale * (-np.log1p(-p)) ** (1.0 / shape)
+    # Guard against rounding at the borders of the range.
+    return np.clip(samples, low, high)
+
+
+def sample_runnable_acet(period, amount=1, scalingFlag=False, rng=None):
     """Create runnables according to the WATERS benchmark.
     scalingFlag: make WCET out of ACET with scaling
     """
-    # Parameters from WATERS 'Real World Automotive Benchmarks For Free'
-    if period == 1:
-        # Pull scaling factor.
-        scaling = np.random.uniform(1.3, 29.11, amount)  # between fmin fmax
-        # Pull samples with weibull distribution.
-        dist = exponweib(1, 1.044, loc=0, scale=1.0/0.214)
-        samples = dist.rvs(size=amount)
-        while True:
-            outliers_detected = False
-            for i in range(len(samples)):
-                # Check if they are in the range.
-                if samples[i] < 0.34 or samples[i] > 30.11:
-                    outliers_detected = True
-                    samples[i] = dist.rvs(size=1)
-            # Case: Some samples had to be pulled again.
-            if outliers_detected:
-                continue
-            # Case: All samples are in the range.
-            if scalingFlag:  # scaling
-                return list(0.001 * samples*scaling)
-            else:
-                return list(0.001 * samples)
-
-    # In the following same structure but different values.
-
-    if period == 2:
-        scaling = np.random.uniform(1.54, 19.04, amount)
-        dist = exponweib(1, 1.0607440083, loc=0, scale=1.0/0.2479463059)
-        samples = dist.rvs(size=amount)
-        while True:
-            outliers_detected = False
-            for i in range(len(samples)):
-                if samples[i] < 0.32 or samples[i] > 40.69:
-                    outliers_detected = True
-                    samples[i] = dist.rvs(size=1)
-            if outliers_detected:
-                continue
-            if scalingFlag:
-                return list(0.001 * samples*scaling)
-            else:
-                return list(0.001 * samples)
-
-    if period == 5:
-        scaling = np.random.uniform(1.13, 18.44, amount)
-        dist = exponweib(1, 1.00818633, loc=0, scale=1.0/0.09)
-        samples = dist.rvs(size=amount)
-        while True:
-            outliers_detected = False
-            for i in range(len(samples)):
-                if samples[i] < 0.36 or samples[i] > 83.38:
-                    outliers_detected = True
-                    samples[i] = dist.rvs(size=1)
-            if outliers_detected:
-                continue
-            if scalingFlag:
-                return list(0.001 * samples*scaling)
-            else:
-                return list(0.001 * samples)
-
-    if period == 10:
-        scaling = np.random.uniform(1.06, 30.03, amount)
-        dist = exponweib(1, 1.0098, loc=0, scale=1.0/0.0985)
-        samples = dist.rvs(size=amount)
-        while True:
-            outliers_detected = False
-            for i in range(len(samples)):
-                if samples[i] < 0.21 or samples[i] > 309.87:
-                    outliers_detected = True
-                    samples[i] = dist.rvs(size=1)
-            if outliers_detected:
-                continue
-            if scalingFlag:
-                return list(0.001 * samples*scaling)
-            else:
-                return list(0.001 * samples)
-
-    if period == 20:
-        scaling = np.random.uniform(1.06, 15.61, amount)
-        dist = exponweib(1, 1.01309699673984310, loc=0, scale=1.0/0.1138186679)
-        samples = dist.rvs(size=amount)
-        while True:
-            outliers_detected = False
-            for i in range(len(samples)):
-                if samples[i] < 0.25 or samples[i] > 291.42:
-                    outliers_detected = True
-                    samples[i] = dist.rvs(size=1)
-            if outliers_detected:
-                continue
-            if scalingFlag:
-                return list(0.001 * samples*scaling)
-            else:
-                return list(0.001 * samples)
-
-    if period == 50:
-        scaling = np.random.uniform(1.13, 7.76, amount)
-        dist = exponweib(1, 1.00324219159296302, loc=0,
-                         scale=1.0/0.05685450460)
-        samples = dist.rvs(size=amount)
-        while True:
-            outliers_detected = False
-            for i in range(len(samples)):
-                if samples[i] < 0.29 or samples[i] > 92.98:
-                    outliers_detected = True
-                    samples[i] = dist.rvs(size=1)
-            if outliers_detected:
-                continue
-            if scalingFlag:
-                return list(0.001 * samples*scaling)
-            else:
-                return list(0.001 * samples)
-
-    if period == 100:
-        scaling = np.random.uniform(1.02, 8.88, amount)
-        dist = exponweib(1, 1.00900736028318527, loc=0,
-                         scale=1.0/0.09448019812)
-        samples = dist.rvs(size=amount)
-        while True:
-            outliers_detected = False
-            for i in range(len(samples)):
-                if samples[i] < 0.21 or samples[i] > 420.43:
-                    outliers_detected = True
-                    samples[i] = dist.rvs(size=1)
-            if outliers_detected:
-                continue
-            if scalingFlag:
-                return list(0.001 * samples*scaling)
-            else:
-                return list(0.001 * samples)
-
-    if period == 200:
-        scaling = np.random.uniform(1.03, 4.9, amount)
-        dist = exponweib(1, 1.15710612360723798, loc=0,
-                         scale=1.0/0.3706045664)
-        samples = dist.rvs(size=amount)
-        while True:
-            outliers_detected = False
-            for i in range(len(samples)):
-                if samples[i] < 0.22 or samples[i] > 21.95:
-                    outliers_detected = True
-                    samples[i] = dist.rvs(size=1)
-            if outliers_detected:
-                continue
-            if scalingFlag:
-                return list(0.001 * samples*scaling)
-            else:
-                return list(0.001 * samples)
-
-    if period == 1000:
-        # No weibull since the range from 0.37 to 0.46 is too short to be
-        # modeled by weibull properly.
-        scaling = np.random.uniform(1.84, 4.75, amount)
-        if scalingFlag:
-            return list(0.001 * np.random.uniform(0.37, 0.46, amount)*scaling)
-        else:
-            return list(0.001 * np.random.uniform(0.37, 0.46, amount))
-
-
-def sum_same_period_tasks(taskset,number_of_task=15, period=[1, 2, 5, 10, 20, 50, 100, 200, 1000]):
-    newtaskset = []
-    # for t in taskset:
-    #     print (t)
-    sorted_task_set = sorted(taskset, key=lambda task: task.period)
-    n_tasks=len(taskset)
-    if(n_tasks <= number_of_task):
+    period_index = np.full(amount, PERIODS.index(period))
+    return list(sample_runnables(period_index, scalingFlag, rng))
+
+
+def sample_runnables(period_index, scalingFlag=False, rng=None):
+    """Execution times of runnables of any periods at once.
+    Variables:
+    period_index: position of the period of each runnable in PERIODS, one
+                  row per task set
+    scalingFlag: make WCET out of ACET with scaling
+    rng: random streams of the sets (lib.rng, default: global state)
+    """
+    rng = streams(rng)
+    fmin, fmax, shape, scale, low, high = (
+        column[period_index] for column in _PROFILE_COLUMNS)
+    draws = rng.random(period_index.shape)
+    # Pull samples in the range [low, high]; uniform if there is no Weibull.
+    weibull = ~np.isnan(shape)
+    samples = low + (high - low) * draws
+    samples[weibull] = truncated_weibull_from_draws(
+        draws[weibull], shape[weibull], scale[weibull], low[weibull],
+        high[weibull])
+    if scalingFlag:  # scaling
+        # Pull scaling factor between fmin fmax.
+        scaling = fmin + (fmax - fmin) * rng.random(period_index.shape)
+        return 0.001 * samples * scaling
+    else:
+        return 0.001 * samples
+
+
+def sum_same_period_tasks(taskset, number_of_task=15, period=PERIODS,
+                          packing='first-fit'):
+    """Merge runnables with the same period into number_of_task tasks.
+    Variables:
+    taskset: runnables (task objects)
+    number_of_task: required number of tasks
+    period: periods whose runnables may be merged
+    packing: 'first-fit' or 'balanced' (see pack_same_period)
+    """
+    if len(taskset) <= number_of_task:
         return taskset
-    flag = False
-    index =0
-    for p in period:
-        sumwcet=0
-        if (flag):
+    periods, wcets = pack_same_period(
+        np.array([t.period for t in taskset]),
+        np.array([t.wcet for t in taskset], dtype=float),
+        number_of_task, period, packing)
+    return [task(wcet=wcet, period=p, deadline=p)
+            for wcet, p in zip(wcets.tolist(), periods.tolist())]
+
+
+def pack_same_period(periods, wcets, number_of_task=15, period=PERIODS,
+                     packing='first-fit'):
+    """Grouped packing of runnables into tasks of the same period.
+    The runnables are sorted by period once; each period class is then cut
+    into consecutive groups with prefix sums and the WCETs of a group are
+    added up with a segmented reduction. The WCET of a task never exceeds
+    its period unless a single runnable does.
+    Variables:
+    periods, wcets: arrays describing the runnables
+    number_of_task: required number of tasks
+    period: periods whose runnables may be merged
+    packing: 'first-fit' merges in increasing period order, filling each
+             task with consecutive runnables until the period is full, and
+             stops as soon as number_of_task is reached (the runnables left
+             over stay single tasks). 'balanced' gives each period class a
+             number of tasks proportional to its utilization and splits it
+             into groups of about equal WCET, which narrows the spread of
+             task utilizations.
+    Returns the (periods, wcets) arrays of the tasks.
+    """
+    order = np.argsort(periods, kind='stable')
+    periods = periods[order]
+    wcets = wcets[order]
+    # Runnables of the k-th mergeable period are at starts[k]:stops[k].
+    mergeable = np.isin(periods, period)
+    classes = np.unique(periods[mergeable])
+    starts = np.searchsorted(periods, classes, side='left')
+    stops = np.searchsorted(periods, classes, side='right')
+
+    if packing == 'first-fit':
+        cuts = _first_fit_cuts(periods, wcets, starts, stops,
+                               len(periods) - number_of_task)
+    elif packing == 'balanced':
+        cuts = _balanced_cuts(periods, wcets, starts, stops,
+                              number_of_task - np.count_nonzero(~mergeable))
+    else:
+        raise ValueError("Unknown packing rule: " + str(packing))
+
+    # Every runnable outside the listed periods stays a task of its own.
+    cuts = np.union1d(cuts, np.flatnonzero(~mergeable))
+    cuts = np.union1d(cuts, starts).astype(np.int64)
+    return periods[cuts], np.add.reduceat(wcets, cuts)
+
+
+def _first_fit_cuts(periods, wcets, starts, stops, reductions):
+    """Group starts for the 'first-fit' packing rule."""
+    cuts = []
+    for start, stop in zip(starts.tolist(), stops.tolist()):
+        p = periods[start]
+        cumulative = np.cumsum(wcets[start:stop])
+        position, base = 0, 0.0
+        while position < stop - start:
+            cuts.append(start + position)
+            if reductions <= 0:
+                # Target reached: the rest of the class stays unmerged.
+                cuts.extend(range(start + position + 1, stop))
+                break
+            # Longest run of runnables that still fits into the period.
+            end = int(np.searchsorted(cumulative, base + p, side='right'))
+            end = min(max(end, position + 1), position + reductions + 1)
+            reductions -= end - position - 1
+            base = cumulative[end - 1]
+            position = end
+    return np.array(cuts, dtype=np.int64)
+
+
+def _balanced_cuts(periods, wcets, starts, stops, number_of_task):
+    """Group starts for the 'balanced' packing rule."""
+    sizes = stops - starts
+    loads = np.add.reduceat(wcets, starts) / periods[starts] \
+        if len(starts) else np.zeros(0)
+    # At least one task per class and enough tasks to fit the load.
+    counts = np.minimum(np.maximum(np.ceil(loads), 1), sizes).astype(np.int64)
+    # Give the remaining tasks to the class with the largest task load.
+    while counts.sum() < number_of_task:
+        candidates = np.where(counts < sizes, loads / counts, -1.0)
+        k = int(np.argmax(candidates))
+        if candidates[k] < 0:
             break
-        for i in range(len(taskset)):
-            if(p==taskset[i].period):
-                if(sumwcet+ taskset[i].wcet <= p):
-                    sumwcet+= taskset[i].wcet
-                    n_tasks-=1
-                else:
-                    newtaskset.append(task(wcet=sumwcet, period=p, deadline=p))
-                    sumwcet=0
-                if(number_of_task == n_tasks):
-                    newtaskset.append(task(wcet=sumwcet, period=p, deadline=p))
-                    index = i+1
-                    break
-                    flag =True
-        if(not flag):
-            newtaskset.append(task(wcet=sumwcet, period=p, deadline=p))
-        else:
-            for i in range(index,len(taskset)):
-                newtaskset.append(taskset[i])
-    # print("-------- After")
-    # for t in newtaskset:
-    #     print (t)
-    # print(len(newtaskset))
-    return newtaskset
+        counts[k] += 1
+
+    cuts = []
+    for k, (start, stop) in enumerate(zip(starts.tolist(), stops.tolist())):
+        cumulative = np.cumsum(wcets[start:stop])
+        p = periods[start]
+        while True:
+            group_cuts = _equal_sum_cuts(cumulative, counts[k])
+            group_wcets = np.diff(np.concatenate(
+                ([0.0], cumulative[group_cuts - 1], [cumulative[-1]])))
+            if group_wcets.max() <= p or counts[k] == stop - start:
+                break
+            counts[k] += 1
+        cuts.append(start)
+        cuts.extend((start + group_cuts).tolist())
+    return np.array(cuts, dtype=np.int64)
+
+
+def _equal_sum_cuts(cumulative, count):
+    """Split points of count consecutive, non-empty groups of about equal
+    sum, given the prefix sums of the group members."""
+    n = len(cumulative)
+    j = np.arange(1, count)
+    cuts = np.searchsorted(cumulative, cumulative[-1] * j / count) + 1
+    # Keep the groups non-empty: strictly increasing cuts in [j, n-count+j].
+    cuts = np.maximum.accumulate(np.maximum(cuts - j, 0))
+    return np.minimum(cuts, n - count) + j
+
+
+def select_subset(utilizations, util_req, threshold):
+    """Subset-sum approximation used to cut one task set out of the pool.
+    Take tasks in order until the utilization exceeds util_req. If that
+    overshoots util_req + threshold, drop the last task and fill up with
+    the following tasks that still fit below util_req + threshold.
+    Returns the positions of the selected tasks.
+    """
+    # Prefix sums give the point where util_req is first exceeded.
+    cumulative = np.cumsum(utilizations)
+    i = int(np.searchsorted(cumulative, util_req, side='right'))
+    if i == len(utilizations):
+        return np.arange(i)
+    util = cumulative[i]
+    if util <= util_req + threshold:
+        return np.arange(i + 1)
+
+    selected = [np.arange(i)]
+    util -= utilizations[i]
+    # Threshold fill: util only grows, so the next accepted task is the
+    # first remaining one that fits with the current util.
+    remaining = utilizations[i:]
+    position = 0
+    while util < util_req:
+        fits = np.flatnonzero(util + remaining[position:]
+                              <= util_req + threshold)
+        if not fits.size:
+            break
+        position += fits[0]
+        util += remaining[position]
+        selected.append([i + position])
+        position += 1
+    return np.concatenate(selected)
 
 
 def gen_tasksets(
         number_of_sets=100, number_of_task=15, util_req=0.5,
         period_pdf=[0.03, 0.02, 0.02, 0.25, 0.40, 0.03, 0.2, 0.01, 0.04],
-        scalingFlag=True, threshold=0.1, cylinder=4, sumRunnable=True):
+        scalingFlag=True, threshold=0.1, cylinder=4, sumRunnable=True,
+        packing='first-fit', rng=None):
     """Main function to generate task sets with the WATERS benchmark.
     Variables:
     number_of_sets: number of task sets
@@ -225,151 +268,36 @@ def gen_tasksets(
     scalingFlag: make WCET out of ACET with scaling
     threshold: accuracy of the required utilization
     cylinder: specific value for WATERS
+    sumRunnable: merge runnables of the same period into number_of_task tasks
+    packing: packing rule used to merge runnables ('first-fit', 'balanced')
+    rng: random streams of the sets (lib.rng, default: global state)
+    Each set is cut out of its own pool of runnables, so a set only
+    depends on its own random stream.
     """
-
-    while True:
-        taskset = []
-        # Create runnable periods.
-        dist = stats.rv_discrete(name='periods',
-                                 values=([1, 2, 5, 10, 20, 50, 100, 200, 1000],
-                                         period_pdf))
-        runnables = (30000*number_of_sets)  # number of runnables
-
-        sys_runnable_periods = dist.rvs(size=runnables)
-
-        # Count runnables.
-        sys_runnables_period_0001_amount = 0
-        sys_runnables_period_0002_amount = 0
-        sys_runnables_period_0005_amount = 0
-        sys_runnables_period_0010_amount = 0
-        sys_runnables_period_0020_amount = 0
-        sys_runnables_period_0050_amount = 0
-        sys_runnables_period_0100_amount = 0
-        sys_runnables_period_0200_amount = 0
-        sys_runnables_period_1000_amount = 0
-
-        for period in sys_runnable_periods:
-            if period == 1:
-                sys_runnables_period_0001_amount += 1
-            elif period == 2:
-                sys_runnables_period_0002_amount += 1
-            elif period == 5:
-                sys_runnables_period_0005_amount += 1
-            elif period == 10:
-                sys_runnables_period_0010_amount += 1
-            elif period == 20:
-                sys_runnables_period_0020_amount += 1
-            elif period == 50:
-                sys_runnables_period_0050_amount += 1
-            elif period == 100:
-                sys_runnables_period_0100_amount += 1
-            elif period == 200:
-                sys_runnables_period_0200_amount += 1
-            elif period == 1000:
-                sys_runnables_period_1000_amount += 1
-            else:
-                print("ERROR")
-
-        # Build tasks from runnables.
-
-        # (PERIOD = 1)
-        # Random WCETs.
-        wcets = sample_runnable_acet(1, sys_runnables_period_0001_amount,
-                                     scalingFlag)
-        # Use WCETs to create tasks.
-        for i in range(sys_runnables_period_0001_amount):
-            taskset.append(task(wcet=wcets[i], period=1, deadline=1))
-
-        # (PERIOD = 2)
-        wcets = sample_runnable_acet(2, sys_runnables_period_0002_amount,
-                                     scalingFlag)
-        for i in range(sys_runnables_period_0002_amount):
-            taskset.append(task(wcet=wcets[i], period=2, deadline=2))
-
-        # (PERIOD = 5)
-        wcets = sample_runnable_acet(5, sys_runnables_period_0005_amount,
-                                     scalingFlag)
-        for i in range(sys_runnables_period_0005_amount):
-            taskset.append(task(wcet=wcets[i], period=5, deadline=5))
-
-        # (PERIOD = 10)
-        wcets = sample_runnable_acet(10, sys_runnables_period_0010_amount,
-                                     scalingFlag)
-        for i in range(sys_runnables_period_0010_amount):
-            taskset.append(task(wcet=wcets[i], period=10, deadline=10))
-
-        # (PERIOD = 20)
-        wcets = sample_runnable_acet(20, sys_runnables_period_0020_amount,
-                                     scalingFlag)
-        for i in range(sys_runnables_period_0020_amount):
-            taskset.append(task(wcet=wcets[i], period=20, deadline=20))
-
-        # (PERIOD = 50)
-        wcets = sample_runnable_acet(50, sys_runnables_period_0050_amount,
-                                     scalingFlag)
-        for i in range(sys_runnables_period_0050_amount):
-            taskset.append(task(wcet=wcets[i], period=50, deadline=50))
-
-        # (PERIOD = 100)
-        wcets = sample_runnable_acet(100, sys_runnables_period_0100_amount,
-                                     scalingFlag)
-        for i in range(sys_runnables_period_0100_amount):
-            taskset.append(task(wcet=wcets[i], period=100, deadline=100))
-
-        # (PERIOD = 200)
-        wcets = sample_runnable_acet(200, sys_runnables_period_0200_amount,
-                                     scalingFlag)
-        for i in range(sys_runnables_period_0200_amount):
-            taskset.append(task(wcet=wcets[i], period=200, deadline=200))
-
-        # (PERIOD = 1000)
-        wcets = sample_runnable_acet(1000, sys_runnables_period_1000_amount,
-                                     scalingFlag)
-        for i in range(sys_runnables_period_1000_amount):
-            taskset.append(task(wcet=wcets[i], period=1000, deadline=1000))
-
-
-        # Shuffke the task set.
-        random.shuffle(taskset)
-        sets = []
-
-        # Select subset of tasks using the subset-sum approximation algorithm.
-
-        for j in range(number_of_sets):
-            thisset = taskset[:3000]
-            taskset = taskset[3000:]
-            util = 0.0
-            i = 0
-            for tasks in thisset:
-                util += tasks.wcet/tasks.period
-                i = i + 1
-                if util > util_req:
-                    break
-
-            if(util <= util_req + threshold):
-                thisset = thisset[:i]
-            else:
-                i = i - 1
-                initialSet = thisset[:i]
-                remainingTasks = thisset[i:]
-                tasks = remainingTasks[0]
-                util -= tasks.wcet/tasks.period
-
-                while (util < util_req):
-                    tasks = remainingTasks[0]
-                    if (util + tasks.wcet/tasks.period
-                            <= util_req + threshold):
-                        util += tasks.wcet/tasks.period
-                        initialSet.append(tasks)
-                    remainingTasks = remainingTasks[1:]
-                thisset = initialSet
-            if (sumRunnable):
-                thisset=sum_same_period_tasks(thisset,number_of_task)
-            sets.append(thisset)
-
-        # # Remove task sets that contain just one task.
-        # for task_set in sets:
-        #     if len(task_set) < 2:
-        #         sets.remove(task_set)
-        return sets
-
+    rng = streams(rng)
+    # Create runnable periods, as positions in PERIODS.
+    runnables = 3000  # number of runnables of each set
+    period_index = rng.choice(len(PERIODS), size=(number_of_sets, runnables),
+                              p=period_pdf)
+    pool_periods = np.asarray(PERIODS)[period_index]
+    # Random WCETs.
+    pool_wcets = sample_runnables(period_index, scalingFlag, rng)
+    pool_utilizations = pool_wcets / pool_periods
+
+    sets = []
+    # Select subset of tasks using the subset-sum approximation algorithm.
+    for j in range(number_of_sets):
+        selected = select_subset(pool_utilizations[j], util_req, threshold)
+        thisset = [task(wcet=wcet, period=period, deadline=period)
+                   for wcet, period in zip(pool_wcets[j, selected].tolist(),
+                                           pool_periods[j, selected].tolist())]
+        if (sumRunnable):
+            thisset = sum_same_period_tasks(thisset, number_of_task,
+                                            packing=packing)
+        sets.append(thisset)
+
+    # # Remove task sets that contain just one task.
+    # for task_set in sets:
+    #     if len(task_set) < 2:
+    #         sets.remove(task_set)
+    return sets
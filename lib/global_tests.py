@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Fast schedulability tests of global scheduling on m identical processors.
+The tests run on many task sets at once (padded (set, task) tables, the PE
+column is ignored) and label each set before an exact analysis such as
+`nptest -m` is run:
+- unschedulable: a necessary condition fails (U > m, or C_i > D_i - J_i);
+- schedulable: one of the sufficient tests of the policy succeeds;
+- unknown: otherwise.
+Sufficient tests (constrained deadlines, release jitter J_i):
+- GFB (Goossens, Funk and Baruah, 2003), global EDF:
+  sum(delta_i) <= m - (m - 1) max(delta_i), delta_i = C_i / (D_i - J_i);
+- BCL (Bertogna, Cirinei and Lipari, 2005/2009, in the line of Baker's
+  BAK test), global EDF and FP: for every task k, with the slack
+  x_k = D_k - J_k - C_k + 1, sum_{i != k} min(I_i, x_k) < m x_k;
+- RTA (Bertogna and Cirinei, 2007), global FP and EDF:
+  R_k = C_k + floor(sum_{i != k} min(I_i(R_k), R_k - C_k + 1) / m) and
+  J_k + R_k <= D_k.
+A job of task i executes between its release on the period grid and
+J_i + R_i (or D_i) later, so the workload of task i in a window of length
+L is at most W_i(L) = N C_i + min(C_i, L + R_i + J_i - C_i - N T_i) with
+N = floor((L + R_i + J_i - C_i) / T_i). Under EDF, only jobs with a
+deadline in the window of task k interfere: at most
+E_i = N C_i + min(C_i, max(0, D_k - N T_i)) with
+N = max(0, floor((D_k - D_i) / T_i) + 1); the absolute deadlines stay on
+the period grid whatever the jitter.
+"""
+import numpy as np
+from lib.rta import as_task_array, group_tables
+from lib.job_set import RATE_MONOTONIC, DEADLINE_MONOTONIC, EDF
+
+SCHEDULABLE = 'schedulable'
+UNSCHEDULABLE = 'unschedulable'
+UNKNOWN = 'unknown'
+# Rounds of the response-time bounds of global EDF.
+max_rounds = 100
+
+
+class _Tables:
+    """Padded (set, priority) tables of some task sets."""
+
+    def __init__(self, tables, valid):
+        self.C = tables['wcet']
+        self.T = tables['period']
+        self.D = tables['deadline']
+        self.J = tables['jitter']
+        self.valid = valid
+
+    def rows(self, rows):
+        sub = _Tables.__new__(_Tables)
+        for name in ('C', 'T', 'D', 'J', 'valid'):
+            setattr(sub, name, getattr(self, name)[rows])
+        return sub
+
+    def pairs(self, sets, max_elements):
+        """Chunks (g, k) of the pairs (set, task) of the given sets, with at
+        most max_elements elements in the (pair, task) arrays of a chunk."""
+        g, k = np.nonzero(self.valid[sets])
+        g = sets[g]
+        step = max(1, max_elements // self.C.shape[1])
+        for start in range(0, g.size, step):
+            yield g[start:start + step], k[start:start + step]
+
+    def interferers(self, g, k, method):
+        """mask[p, i]: task i interferes with task k of the pair p."""
+        mask = self.valid[g]
+        if method == EDF:
+            return mask & (np.arange(mask.shape[1]) != k[:, None])
+        # The tables are in priority order.
+        return mask & (np.arange(mask.shape[1]) < k[:, None])
+
+
+def _workload(C, T, L, R):
+    """W_i(L) of the tasks i (columns) for the window L of each row;
+    R: completion bound of task i after its release on the period grid."""
+    span = L[:, None] + R - C
+    jobs = span // T
+    return jobs * C + np.minimum(C, span - jobs * T)
+
+
+def _edf_workload(C, T, D, Dk):
+    """E_i of the tasks i (columns): jobs of i with a deadline in the window
+    of the length Dk of each row."""
+    jobs = np.maximum(0, (Dk[:, None] - D) // T + 1)
+    return jobs * C + np.minimum(C, np.maximum(0, Dk[:, None] - jobs * T))
+
+
+def _interference_sum(bound, cap, mask):
+    """sum_i min(bound_i, cap) over the interfering tasks i of each row."""
+    return np.sum(np.where(mask, np.minimum(bound, cap[:, None]), 0), axis=1)
+
+
+def necessary(tables, n_pe):
+    """False for the sets that no scheduler can schedule on n_pe PEs."""
+    u = np.sum(np.where(tables.valid, tables.C / tables.T, 0), axis=1)
+    late = tables.valid & (tables.C > tables.D - tables.J)
+    return (u <= n_pe * (1 + 1e-12)) & ~np.any(late, axis=1)
+
+
+def gfb(tables, n_pe):
+    """GFB density test of global EDF."""
+    window = np.minimum(tables.D, tables.T) - tables.J
+    density = np.where(tables.valid, tables.C / np.maximum(window, 1), 0)
+    fits = np.all(~tables.valid | (window >= tables.C), axis=1)
+    return fits & (density.sum(axis=1)
+                   <= n_pe - (n_pe - 1) * density.max(axis=1, initial=0))
+
+
+def bcl(tables, n_pe, method, max_elements=10**6):
+    """BCL interference test of global EDF or FP."""
+    C, T, D, J = tables.C, tables.T, tables.D, tables.J
+    slack = D - J - C + 1
+    passed = np.ones(C.shape[0], dtype=bool)
+    for g, k in tables.pairs(np.arange(C.shape[0]), max_elements):
+        if method == EDF:
+            bound = _edf_workload(C[g], T[g], D[g], D[g, k])
+        else:
+            # Window of task k: D_k - J_k after its arrival; jobs of task i
+            # end by their deadline.
+            bound = _workload(C[g], T[g], D[g, k] - J[g, k], D[g])
+        x = slack[g, k]
+        total = _interference_sum(bound, x, tables.interferers(g, k, method))
+        passed[g[(x <= 0) | (total >= n_pe * x)]] = False
+    return passed
+
+
+def rta(tables, n_pe, method, max_elements=10**6):
+    """Response-time test of global FP or EDF."""
+    if method == EDF:
+        return _edf_rta(tables, n_pe, max_elements)
+    return _fp_rta(tables, n_pe, max_elements)
+
+
+def _fp_rta(tables, n_pe, max_elements):
+    """The tasks are taken in priority order: the bounds of the higher
+    priority tasks are final, and a set stops at its first task past
+    D - J."""
+    C, T, J, valid = tables.C, tables.T, tables.J, tables.valid
+    limit = tables.D - J
+    R = C.copy()
+    passed = np.ones(C.shape[0], dtype=bool)
+    for k in range(C.shape[1]):
+        sets = np.flatnonzero(passed & valid[:, k])
+        step = max(1, max_elements // max(k, 1))
+        for start in range(0, sets.size, step):
+            g = sets[start:start + step]
+            Cg, Tg, mask = C[g, :k], T[g, :k], valid[g, :k]
+            # Completion bounds of the higher priority tasks.
+            done = R[g, :k] + J[g, :k]
+            Ck = C[g, k]
+            R[g, k] = _fixed_point(Ck, limit[g, k], n_pe, lambda rows, L: _interference_sum(
+                _workload(Cg[rows], Tg[rows], L, done[rows]), L - Ck[rows] + 1, mask[rows]))
+            passed[g] = R[g, k] <= limit[g, k]
+    return passed
+
+
+def _edf_rta(tables, n_pe, max_elements):
+    """Iterative bounds: every R_k starts at D_k - J_k, and each round
+    computes new bounds from those of the previous round. A bound past
+    D - J is not taken (the task keeps D - J). A set passes in the first
+    round where all its bounds are within D - J; it stops without passing
+    when no bound changes or after max_rounds rounds."""
+    C, T, D, J, valid = tables.C, tables.T, tables.D, tables.J, tables.valid
+    limit = D - J
+    R = limit.copy()
+    passed = np.zeros(C.shape[0], dtype=bool)
+    active = np.arange(C.shape[0])
+    for _ in range(max_rounds):
+        new = R.copy()
+        for g, k in tables.pairs(active, max_elements):
+            Cg, Tg = C[g], T[g]
+            done = R[g] + J[g]
+            bound = _edf_workload(Cg, Tg, D[g], D[g, k])
+            mask = tables.interferers(g, k, EDF)
+            Ck = C[g, k]
+            new[g, k] = _fixed_point(Ck, limit[g, k], n_pe, lambda rows, L: _interference_sum(
+                np.minimum(_workload(Cg[rows], Tg[rows], L, done[rows]), bound[rows]),
+                L - Ck[rows] + 1, mask[rows]))
+        fits = np.all(~valid[active] | (new[active] <= limit[active]), axis=1)
+        passed[active[fits]] = True
+        tighter = np.minimum(new[active], R[active])
+        changed = np.any(tighter != R[active], axis=1)
+        R[active] = tighter
+        active = active[~fits & changed]
+        if not active.size:
+            break
+    return passed
+
+
+def _fixed_point(base, limit, n_pe, interference):
+    """Least R >= base with R = base + floor(interference(R) / m) for each
+    row; a row stops as soon as its R passes limit. interference(rows, R)
+    gives sum_i min(W_i(R), R - base + 1) of the given rows."""
+    R = base.copy()
+    active = np.flatnonzero(R <= limit)
+    while active.size:
+        Ra = R[active]
+        new = base[active] + interference(active, Ra) // n_pe
+        R[active] = new
+        active = active[(new != Ra) & (new <= limit[active])]
+    return R
+
+
+def _set_tables(task_sets, method):
+    tables, order, group, position, valid = group_tables(
+        task_sets, DEADLINE_MONOTONIC if method == EDF else method, by_pe=False)
+    group_set = np.zeros(valid.shape[0], dtype=np.int64)
+    group_set[group] = task_sets.set_index()[order]
+    return _Tables(tables, valid), group_set
+
+
+def classify(task_sets, n_pe, method=EDF, max_elements=10**6):
+    """Label every task set for global scheduling on n_pe PEs.
+    Variables:
+    task_sets: a TaskSetArray with integer columns, or lists of tasks
+    n_pe: number of processors
+    method: RATE_MONOTONIC, DEADLINE_MONOTONIC or EDF (lib.job_set)
+    max_elements: size of the (pair, task) arrays of one step, a pair
+                  being one task of one set
+    Returns an array with SCHEDULABLE, UNSCHEDULABLE or UNKNOWN per set.
+    """
+    if method not in (RATE_MONOTONIC, DEADLINE_MONOTONIC, EDF):
+        raise ValueError("Selected method not valid")
+    task_sets = as_task_array(task_sets)
+    labels = np.full(len(task_sets), SCHEDULABLE, dtype=object)
+    if not task_sets.n_tasks:
+        return labels
+    tables, group_set = _set_tables(task_sets, method)
+    possible = necessary(tables, n_pe)
+    if method == EDF:
+        passed = gfb(tables, n_pe)
+    else:
+        passed = np.zeros(group_set.size, dtype=bool)
+    # Each test only for the sets that are still open.
+    for test in (bcl, rta):
+        open_sets = np.flatnonzero(possible & ~passed)
+        if open_sets.size:
+            passed[open_sets] = test(tables.rows(open_sets), n_pe, method, max_elements)
+    labels[group_set] = np.where(
+        ~possible, UNSCHEDULABLE, np.where(passed, SCHEDULABLE, UNKNOWN))
+    return labels
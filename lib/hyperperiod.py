@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Hyperperiod and job count of a task set, from the periods alone.
+Python integers are used, so long hyperperiods do not overflow.
+"""
+from math import gcd
+
+
+## calculate least common multiple of two number
+def lcm(a, b):
+    return abs(a * b) // gcd(a, b) if a and b else 0
+
+
+def hyperperiod(periods, limit=None):
+    """Least common multiple of the periods.
+    Variables:
+    periods: task periods (integers)
+    limit: stop as soon as the hyperperiod exceeds limit (the returned
+           value is then only known to be larger than limit)
+    """
+    h = 1
+    for p in periods:
+        h = lcm(h, int(p))
+        if limit is not None and h > limit:
+            break
+    return h
+
+
+def job_count(periods, h=None):
+    """Number of jobs of the periods in one hyperperiod: sum(H / T_i)."""
+    periods = [int(p) for p in periods]
+    if h is None:
+        h = hyperperiod(periods)
+    return sum(h // p for p in periods)
+
+
+def periods_of(task_set):
+    """Periods of a task set (TaskSetView or list of tasks)."""
+    if hasattr(task_set, 'column'):
+        return task_set.column('period').tolist()
+    return [t.period for t in task_set]
+
+
+def within_limits(task_set, max_jobs=None, max_hyperperiod=None):
+    """Whether the job set of a task set respects the given bounds."""
+    periods = periods_of(task_set)
+    limit = max_hyperperiod
+    if max_jobs is not None:
+        # H / max(T) <= number of jobs, so H is bounded by the job limit.
+        bound = max_jobs * max(periods)
+        limit = bound if limit is None else min(limit, bound)
+    h = hyperperiod(periods, limit)
+    if limit is not None and h > limit:
+        return False
+    return max_jobs is None or job_count(periods, h) <= max_jobs
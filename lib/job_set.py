@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""Lazy job sets.
+A JobSetView describes all jobs of a task set in one hyperperiod without
+creating them: only the task table is stored, and the arrival window,
+absolute deadline and priority of a job are computed when it is accessed.
+The jobs are ordered by (task id, instance). The priority of a job is its
+rank when all jobs are ordered by period (RM), relative deadline (DM) or
+absolute deadline (EDF), ties broken by task order and instance.
+"""
+import heapq
+import numpy as np
+
+# Priority assignment methods of priority_generator.
+RATE_MONOTONIC = 0
+DEADLINE_MONOTONIC = 1
+EDF = 2
+METHODS = (RATE_MONOTONIC, DEADLINE_MONOTONIC, EDF)
+# Short names used in file names.
+METHOD_NAMES = {RATE_MONOTONIC: 'rm', DEADLINE_MONOTONIC: 'dm', EDF: 'edf'}
+
+JOB_CSV_HEADER = ['Name', 'Arrival min.', 'Arrival max.', 'BCET', 'WCET',
+                  'Abs. deadline', 'PE', 'Priority']
+SAG_CSV_HEADER = ['Task ID', 'Job ID', 'Arrival min', 'Arrival max',
+                  'Cost min', 'Cost max', 'Deadline', 'Priority']
+
+
+class JobSetView:
+    """All jobs of a task set in one hyperperiod, computed on demand."""
+
+    def __init__(self, task_set, hyperperiod, method=RATE_MONOTONIC,
+                 chunk_size=65536):
+        """Create the view.
+        Variables:
+        task_set: tasks (a TaskSetView or a list of lib.task.task)
+        hyperperiod: length of the job set
+        method: priority assigning method (0: Rate-monotonic,
+                1: Deadline-monotonic, 2: Earliest deadline first), the
+                default of the methods that take a method
+        chunk_size: number of jobs computed at once when iterating
+        """
+        if method not in METHODS:
+            raise ValueError("Selected method not valid")
+        tasks = list(task_set)
+        self.method = method
+        self.hyperperiod = hyperperiod
+        self.chunk_size = chunk_size
+        self.names = [t.name for t in tasks]
+        self.jitter = [t.jitter for t in tasks]
+        self.bcet = [t.bcet for t in tasks]
+        self.wcet = [t.wcet for t in tasks]
+        self.period = np.array([t.period for t in tasks], dtype=np.int64)
+        self.deadline = np.array([t.deadline for t in tasks], dtype=np.int64)
+        self.pe = [t.pe for t in tasks]
+        # Number of jobs of each task (task order of the task set).
+        self.count = np.array([hyperperiod // t.period for t in tasks],
+                              dtype=np.int64)
+
+        # The jobs of one task are consecutive, the tasks in order of id.
+        self.order = sorted(range(len(tasks)),
+                            key=lambda k: int(self.names[k].replace('T', '')))
+        self.first = np.concatenate(
+            ([0], np.cumsum(self.count[self.order]))).astype(np.int64)
+
+        # RM and DM: the stable sort by period (deadline) ranks the jobs of
+        # a task after all jobs of tasks with a smaller key, and of earlier
+        # tasks with the same key, so priority = base + instance.
+        self.base = {}
+        for fixed, key in ((RATE_MONOTONIC, self.period),
+                           (DEADLINE_MONOTONIC, self.deadline)):
+            rank = np.lexsort((np.arange(len(tasks)), key))
+            base = np.zeros(len(tasks), dtype=np.int64)
+            base[rank] = np.concatenate(([0], np.cumsum(self.count[rank])[:-1]))
+            self.base[fixed] = base
+
+    def __len__(self):
+        return int(self.first[-1])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('job index out of range')
+        position = int(np.searchsorted(self.first, index, side='right')) - 1
+        k = self.order[position]
+        return JobView(self, k, index - int(self.first[position]))
+
+    def __iter__(self):
+        for k in self.order:
+            for instance in range(int(self.count[k])):
+                yield JobView(self, k, instance)
+
+    def priority(self, k, instances, method=None):
+        """Priorities of the given instances (numpy array) of task k."""
+        if method is None:
+            method = self.method
+        if method != EDF:
+            return self.base[method][k] + instances
+        # EDF: the stable sort by absolute deadline ranks a job after the
+        # jobs with an earlier deadline and, for equal deadlines, after the
+        # jobs of the tasks before k.
+        absolute_deadline = instances * self.period[k] + self.deadline[k]
+        priority = np.zeros(len(instances), dtype=np.int64)
+        for j in range(len(self.names)):
+            slack = absolute_deadline - self.deadline[j]
+            if j < k:
+                # Jobs m with m * period <= slack.
+                earlier = np.where(slack >= 0, slack // self.period[j] + 1, 0)
+            else:
+                # Jobs m with m * period < slack.
+                earlier = np.where(slack > 0, -(-slack // self.period[j]), 0)
+            priority += np.minimum(earlier, self.count[j])
+        return priority
+
+    def _merge_is_faster(self):
+        """Whether edf_priorities is faster than counting (priority) for the
+        whole job set. Counting costs O(n) vectorized operations per job
+        plus O(n) numpy calls per task, the merge O(log n) Python
+        operations per job (constants measured with numpy 2)."""
+        n = len(self.names)
+        return n * (len(self) + 1000 * n) > 200 * len(self)
+
+    def edf_priorities(self):
+        """EDF priorities of all jobs, in the order of the job set.
+        The jobs of each task are already sorted by absolute deadline, so
+        the ranks come from a k-way heap merge of the per-task streams
+        keyed by (absolute deadline, task, instance).
+        """
+        priorities = np.empty(len(self), dtype=np.int64)
+        first = np.empty(len(self.names), dtype=np.int64)
+        first[self.order] = self.first[:-1]
+        streams = [_deadline_stream(k, period, deadline, count)
+                   for k, (period, deadline, count) in enumerate(zip(
+                       self.period.tolist(), self.deadline.tolist(),
+                       self.count.tolist()))]
+        first = first.tolist()
+        for priority, (_, k, i) in enumerate(heapq.merge(*streams)):
+            priorities[first[k] + i] = priority
+        return priorities
+
+    def csv_size(self, mapping=True, sag_format=False):
+        """Exact size in bytes of the CSV file of the job set (as written by
+        priority_generator), computed from the task table by counting
+        digits, without expanding the jobs."""
+        header = SAG_CSV_HEADER if sag_format else JOB_CSV_HEADER
+        if not mapping and not sag_format:
+            header = header[:-2] + header[-1:]
+        # Fields are separated by ',' and rows end with '\r\n'.
+        size = len(','.join(header)) + 2
+        for k, name in enumerate(self.names):
+            n = int(self.count[k])
+            period = int(self.period[k])
+            if sag_format:
+                fixed = [name.replace('T', ''), self.bcet[k], self.wcet[k]]
+                size += _digits_sum(0, 1, n)  # Job ID
+            else:
+                fixed = [self.bcet[k], self.wcet[k]]
+                if mapping:
+                    fixed.append(self.pe[k])
+                # Quoted job name '"T<id>,<instance>"'.
+                size += n * (len(name) + 3) + _digits_sum(0, 1, n)
+            size += n * sum(len(str(value)) for value in fixed)
+            size += _digits_sum(0, period, n)
+            size += _digits_sum(self.jitter[k], period, n)
+            size += _digits_sum(int(self.deadline[k]), period, n)
+            size += n * (len(header) - 1 + 2)
+        # The priorities are a permutation of 0, ..., len(self)-1.
+        return size + _digits_sum(0, 1, len(self))
+
+    def rows(self, mapping=True, sag_format=False, method=None):
+        """Iterate over the CSV rows of the jobs (see JobView.get_data).
+        The jobs are computed in chunks of chunk_size, so memory does not
+        depend on the length of the job set (except when the EDF
+        priorities come from edf_priorities, one integer per job).
+        """
+        if method is None:
+            method = self.method
+        for chunk in self.rows_by_method([method], mapping, sag_format):
+            yield from chunk[0]
+
+    def rows_by_method(self, methods, mapping=True, sag_format=False):
+        """Iterate over chunks of CSV rows for several priority methods.
+        Each item holds one list of rows per method. The arrival windows
+        and deadlines of a chunk are computed once for all methods.
+        """
+        merged = None
+        if EDF in methods and self._merge_is_faster():
+            merged = self.edf_priorities()
+        for position, k in enumerate(self.order):
+            name = self.names[k]
+            task_id = name.replace('T', '')
+            bcet, wcet, pe = self.bcet[k], self.wcet[k], self.pe[k]
+            for start in range(0, int(self.count[k]), self.chunk_size):
+                instances = np.arange(start, min(start + self.chunk_size,
+                                                 int(self.count[k])))
+                arrival = instances * self.period[k]
+                columns = (instances.tolist(), arrival.tolist(),
+                           (arrival + self.jitter[k]).tolist(),
+                           (arrival + self.deadline[k]).tolist())
+                # Everything but the priority.
+                if sag_format:
+                    heads = [[task_id, instance, earliest, latest, bcet,
+                              wcet, deadline]
+                             for instance, earliest, latest, deadline
+                             in zip(*columns)]
+                elif mapping:
+                    heads = [[name + ',' + str(instance), earliest, latest,
+                              bcet, wcet, deadline, pe]
+                             for instance, earliest, latest, deadline
+                             in zip(*columns)]
+                else:
+                    heads = [[name + ',' + str(instance), earliest, latest,
+                              bcet, wcet, deadline]
+                             for instance, earliest, latest, deadline
+                             in zip(*columns)]
+                chunk = []
+                for method in methods:
+                    if method == EDF and merged is not None:
+                        priority = merged[self.first[position] + instances]
+                    else:
+                        priority = self.priority(k, instances, method)
+                    chunk.append([head + [p] for head, p
+                                  in zip(heads, priority.tolist())])
+                yield chunk
+
+
+def _digits_sum(start, step, count):
+    """Number of decimal digits of start, start+step, ..., start+(count-1)*step
+    (non-negative integers) all together."""
+    if count <= 0:
+        return 0
+    # Every value has one digit, plus one for each power of ten it reaches.
+    total = count
+    last = start + step * (count - 1)
+    power = 10
+    while power <= last:
+        if step:
+            below = min(count, max(0, -(-(power - start) // step)))
+        else:
+            below = 0
+        total += count - below
+        power *= 10
+    return total
+
+
+def _deadline_stream(k, period, deadline, count):
+    """(absolute deadline, task, instance) of the jobs of task k."""
+    for i in range(count):
+        yield i * period + deadline, k, i
+
+
+class JobView:
+    """One job of a JobSetView with the interface of lib.job.job."""
+
+    __slots__ = ('job_set', 'task', 'instance_num')
+
+    def __init__(self, job_set, task, instance_num):
+        self.job_set = job_set
+        self.task = task
+        self.instance_num = instance_num
+
+    @property
+    def name(self):
+        return self.job_set.names[self.task]
+
+    @property
+    def job_name(self):
+        return self.name + ',' + str(self.instance_num)
+
+    @property
+    def jitter(self):
+        return self.job_set.jitter[self.task]
+
+    @property
+    def bcet(self):
+        return self.job_set.bcet[self.task]
+
+    @property
+    def wcet(self):
+        return self.job_set.wcet[self.task]
+
+    @property
+    def period(self):
+        return int(self.job_set.period[self.task])
+
+    @property
+    def deadline(self):
+        return int(self.job_set.deadline[self.task])
+
+    @property
+    def pe(self):
+        return self.job_set.pe[self.task]
+
+    @property
+    def earliest_arrival(self):
+        return self.period * self.instance_num
+
+    @property
+    def latest_arrival(self):
+        return self.earliest_arrival + self.jitter
+
+    @property
+    def absolute_deadline(self):
+        return self.earliest_arrival + self.deadline
+
+    @property
+    def priority(self):
+        return int(self.job_set.priority(
+            self.task, np.array([self.instance_num], dtype=np.int64))[0])
+
+    def get_id(self):
+        return self.name.replace('T', '')
+
+    def __str__(self):
+        res = "%-7s\tPE=%2s\tBCET=%-5.1f\tWCET=%-5.1f\tArrival window=[%7s, %7s]\tAbs. deadline=%7s\tPriority=%4s" \
+              % (self.job_name, self.pe, self.bcet, self.wcet, self.earliest_arrival, self.latest_arrival,
+                 self.absolute_deadline, self.priority)
+        return res
+
+    def __repr__(self):
+        return repr((self.job_name, self.pe, self.jitter, self.bcet, self.wcet
+                     , self.period, self.absolute_deadline))
+
+    def get_data(self, mapping=False, sag_format=False):
+        if not mapping and not sag_format:
+            return [self.job_name, self.earliest_arrival, self.latest_arrival, self.bcet, self.wcet
+                , self.absolute_deadline, self.priority]
+
+        elif sag_format:
+            return [self.get_id(), self.instance_num, self.earliest_arrival, self.latest_arrival, self.bcet, self.wcet
+                , self.absolute_deadline, self.priority]
+        else:
+            return [self.job_name, self.earliest_arrival, self.latest_arrival, self.bcet, self.wcet
+                , self.absolute_deadline, self.pe, self.priority]
+
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Partitioning of task sets onto processing elements (PEs).
+The tasks of a set are placed in decreasing order of utilization; every PE
+has a capacity of 1 and every set starts with empty PEs. Worst-fit keeps
+the PEs in a heap, first-fit in a max segment tree and best-fit in two
+heaps (the PEs that fit the current task and the fuller ones), so placing
+a task costs O(log m) instead of a scan of the m PEs. Ties go to the PE
+with the lowest index.
+"""
+import heapq
+from fractions import Fraction
+import numpy as np
+
+WORST_FIT = 1
+FIRST_FIT = 2
+BEST_FIT = 3
+NEXT_FIT = 4
+METHOD_NAMES = {WORST_FIT: 'worst-fit', FIRST_FIT: 'first-fit',
+                BEST_FIT: 'best-fit', NEXT_FIT: 'next-fit'}
+
+
+class PartitioningError(ValueError):
+    """A task does not fit on any PE."""
+
+    def __init__(self, method, n_pe, task_index, utilization, set_index=None):
+        self.method = method
+        self.n_pe = n_pe
+        self.task_index = task_index
+        self.utilization = utilization
+        self.set_index = set_index
+        where = "" if set_index is None else "task set %d: " % set_index
+        super().__init__("%sTask %d (utilization %.4f) does not fit on any of the %d PEs (%s)"
+                         % (where, task_index, utilization, n_pe,
+                            METHOD_NAMES[method]))
+
+
+class _WorstFit:
+    def __init__(self, n_pe):
+        self.heap = [(-1.0, pe) for pe in range(n_pe)]
+
+    def place(self, u):
+        remaining, pe = self.heap[0]
+        if -remaining - u < 0:
+            return None
+        heapq.heapreplace(self.heap, (remaining + u, pe))
+        return pe
+
+
+class _FirstFit:
+    def __init__(self, n_pe):
+        size = 1
+        while size < n_pe:
+            size *= 2
+        self.size = size
+        # Leaves are the remaining capacities; missing PEs never fit.
+        self.tree = [-1.0] * (2 * size)
+        self.tree[size:size + n_pe] = [1.0] * n_pe
+        for node in range(size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def place(self, u):
+        tree = self.tree
+        if tree[1] - u < 0:
+            return None
+        # Leftmost leaf with enough capacity.
+        node = 1
+        while node < self.size:
+            node *= 2
+            if tree[node] - u < 0:
+                node += 1
+        tree[node] -= u
+        pe = node - self.size
+        node //= 2
+        while node:
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+            node //= 2
+        return pe
+
+
+class _BestFit:
+    # The tasks come in decreasing utilization, so a PE that fits the
+    # current task fits all later ones: those PEs are in a min-heap of the
+    # remaining capacity, the fuller ones in a max-heap until the
+    # utilization drops below their remaining capacity.
+    def __init__(self, n_pe):
+        self.fitting = [(1.0, pe) for pe in range(n_pe)]
+        self.full = []
+
+    def place(self, u):
+        while self.full and -self.full[0][0] - u >= 0:
+            remaining, pe = heapq.heappop(self.full)
+            heapq.heappush(self.fitting, (-remaining, pe))
+        if not self.fitting:
+            return None
+        # Fullest PE with enough capacity.
+        remaining, pe = heapq.heappop(self.fitting)
+        remaining -= u
+        if remaining - u >= 0:
+            heapq.heappush(self.fitting, (remaining, pe))
+        else:
+            heapq.heappush(self.full, (-remaining, pe))
+        return pe
+
+
+class _NextFit:
+    def __init__(self, n_pe):
+        self.n_pe = n_pe
+        self.pe = 0
+        self.remaining = 1.0
+
+    def place(self, u):
+        # PEs that are left behind are closed for good.
+        while self.remaining - u < 0:
+            self.pe += 1
+            self.remaining = 1.0
+            if self.pe >= self.n_pe:
+                return None
+        self.remaining -= u
+        return self.pe
+
+
+_BINS = {WORST_FIT: _WorstFit, FIRST_FIT: _FirstFit, BEST_FIT: _BestFit,
+         NEXT_FIT: _NextFit}
+
+
+def partition(utilizations, n_pe, method):
+    """Map the tasks of one set onto n_pe PEs.
+    Variables:
+    utilizations: utilization of each task
+    n_pe: number of PEs
+    method: WORST_FIT, FIRST_FIT, BEST_FIT or NEXT_FIT
+    Returns the PE of each task (in the order of utilizations) and raises
+    PartitioningError if a task does not fit.
+    """
+    if method not in _BINS:
+        raise ValueError("Unknown partitioning method: " + str(method))
+    utilizations = np.asarray(utilizations, dtype=float)
+    bins = _BINS[method](n_pe)
+    pe = np.zeros(utilizations.size, dtype=np.int64)
+    # Decreasing utilization, ties in task order.
+    order = np.argsort(-utilizations, kind='stable').tolist()
+    for i, u in zip(order, utilizations[order].tolist()):
+        chosen = bins.place(u)
+        if chosen is None:
+            raise PartitioningError(method, n_pe, i, u)
+        pe[i] = chosen
+    return pe
+
+
+def partition_sets(utilizations, offsets, n_pe, method, set_indices=None,
+                   failed=None):
+    """Map every task set of a batch; set k spans the rows
+    offsets[k]:offsets[k+1] (see lib.task_array). Returns the PE of each row.
+    set_indices: index of each set in the experiment, for the error
+    (default: its position in the batch)
+    failed: if a list, the index of every set that cannot be mapped is
+    appended to it (its tasks stay on PE 0) instead of raising
+    """
+    utilizations = np.asarray(utilizations, dtype=float)
+    pe = np.zeros(utilizations.size, dtype=np.int64)
+    for k in range(len(offsets) - 1):
+        start, stop = int(offsets[k]), int(offsets[k + 1])
+        index = k if set_indices is None else set_indices[k]
+        try:
+            pe[start:stop] = partition(utilizations[start:stop], n_pe, method)
+        except PartitioningError as e:
+            if failed is None:
+                raise PartitioningError(method, n_pe, e.task_index,
+                                        e.utilization, index)
+            failed.append(index)
+    return pe
+
+
+def fits(task_sets):
+    """Whether no PE of each task set is loaded above 1 (one bool per set).
+    task_sets: a TaskSetArray with integer columns; PE loads within 1e-9
+    of 1 are summed exactly.
+    """
+    sets = task_sets.set_index()
+    n_pe = int(task_sets.pe.max()) + 1 if task_sets.n_tasks else 1
+    group = sets * n_pe + task_sets.pe
+    load = np.bincount(group, weights=task_sets.wcet / task_sets.period,
+                       minlength=len(task_sets) * n_pe)
+    over = load > 1 + 1e-9
+    for g in np.flatnonzero(np.abs(load - 1) <= 1e-9).tolist():
+        rows = np.flatnonzero(group == g)
+        over[g] = sum(Fraction(c, p) for c, p in zip(
+            task_sets.wcet[rows].tolist(), task_sets.period[rows].tolist())) > 1
+    return ~np.any(over.reshape(len(task_sets), n_pe), axis=1)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Periods with a bounded hyperperiod.
+Log-uniform periods usually have a huge least common multiple. Here the
+periods are taken from the divisors of one hyperperiod H <= bound built
+from small prime powers (2^a 3^b 5^c 7^d, in the spirit of the
+Goossens-Macq period generation), so any task set drawn from them has a
+hyperperiod of at most H. H is chosen so that its divisors cover
+[min_period, max_period] as evenly as possible on a log scale, and each
+period is the candidate nearest (in log space) to a log-uniform draw.
+"""
+import functools
+import numpy as np
+from lib.rng import streams
+
+SMALL_PRIMES = (2, 3, 5, 7)
+
+
+def smooth_numbers(bound, primes=SMALL_PRIMES):
+    """All numbers <= bound without prime factors outside primes, sorted."""
+    numbers = [1]
+    for p in primes:
+        powers = []
+        for n in numbers:
+            while n <= bound:
+                powers.append(n)
+                n *= p
+        numbers = powers
+    return sorted(numbers)
+
+
+@functools.lru_cache(maxsize=32)
+def candidate_periods(min_period, max_period, max_hyperperiod, granularity=1):
+    """Periods in [min_period, max_period] (multiples of granularity) that
+    all divide one hyperperiod H <= max_hyperperiod.
+    Among the possible H, the one whose periods leave the smallest largest
+    gap on a log scale is used (then the one with more periods, then the
+    smaller one).
+    Returns the sorted periods as a read-only numpy array.
+    """
+    smooth = np.array(smooth_numbers(max_hyperperiod), dtype=np.int64)
+    periods = smooth[(smooth >= min_period) & (smooth <= max_period)
+                     & (smooth % granularity == 0)]
+    best, best_score = None, None
+    for h in smooth[smooth % granularity == 0].tolist():
+        divisors = periods[h % periods == 0]
+        if not divisors.size:
+            continue
+        log_points = np.concatenate(([np.log(min_period)], np.log(divisors),
+                                     [np.log(max_period)]))
+        score = (np.diff(log_points).max(), -divisors.size, h)
+        if best_score is None or score < best_score:
+            best, best_score = divisors, score
+    if best is None:
+        raise ValueError("No period in [%g, %g] divides a hyperperiod of at most %d"
+                         % (min_period, max_period, max_hyperperiod))
+    best = best.astype(float)
+    best.setflags(write=False)
+    return best
+
+
+def generate_periods_bounded(num_tasks, num_tasksets, min_period, max_period,
+                             max_hyperperiod, granularity=1, rng=None):
+    """Draw periods whose hyperperiod is at most max_hyperperiod.
+    Variables:
+    num_tasks: number of tasks per set
+    num_tasksets: number of sets
+    min_period: minimal period
+    max_period: maximal period
+    max_hyperperiod: bound of the hyperperiod of every task set
+    granularity: periods are multiples of granularity
+    rng: random streams of the sets (lib.rng, default: global state)
+    Returns a (num_tasksets, num_tasks) numpy array.
+    """
+    periods = candidate_periods(min_period, max_period, int(max_hyperperiod),
+                                granularity)
+    log_periods = np.log(periods)
+    draws = streams(rng).uniform(low=np.log(min_period),
+                                 high=np.log(max_period),
+                                 size=(num_tasksets, num_tasks))
+    # Nearest candidate on a log scale.
+    edges = (log_periods[1:] + log_periods[:-1]) / 2
+    return periods[np.searchsorted(edges, draws)]
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""Roger Stafford's randfixedsum, shared by the fixed-sum generators.
+Taken from the taskset generator for experiments with real-time task sets
+Copyright 2010 Paul Emberson, Roger Stafford, Robert Davis. 
+All rights reserved.
+Redistribution and use in source and binary forms, with or without 
+modification, are permitted provided that the following conditions are met:
+   1. Redistributions of source code must retain the above copyright notice, 
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer in the documentation 
+      and/or other materials provided with the distribution.
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY EXPRESS 
+OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES 
+OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO 
+EVENT SHALL THE AUTHORS OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, 
+INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT 
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, 
+OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF 
+LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE 
+OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF 
+ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+The views and conclusions contained in the software and documentation are 
+those of the authors and should not be interpreted as representing official 
+policies, either expressed or implied, of Paul Emberson, Roger Stafford or 
+Robert Davis.
+Includes Python implementation of Roger Stafford's randfixedsum implementation
+http://www.mathworks.com/matlabcentral/fileexchange/9700
+Adapted specifically for the purpose of taskset generation with fixed
+total utilisation value
+Please contact paule@rapitasystems.com or robdavis@cs.york.ac.uk if you have 
+any questions regarding this software.
+"""
+
+import functools
+import numpy
+
+from lib.rng import streams, permutations
+
+
+@functools.lru_cache(maxsize=16)
+def _transition_table(n, u):
+    """Transition table of randfixedsum for n values summing to u.
+    The table only depends on (n, u) and costs O(n^2) time and memory, so
+    it is built once and reused by all later calls with the same (n, u).
+    """
+    k = numpy.floor(u)
+    s = u
+    step = 1 if k < (k-n+1) else -1
+    s1 = s - numpy.arange( k, (k-n+1)+step, step )
+    step = 1 if (k+n) < (k-n+1) else -1
+    s2 = numpy.arange( (k+n), (k+1)+step, step ) - s
+
+    tiny = numpy.finfo(float).tiny
+    huge = numpy.finfo(float).max
+
+    w = numpy.zeros((n, n+1))
+    w[0,1] = huge
+    t = numpy.zeros((n-1,n))
+
+    for i in range(2, (n+1)):
+        tmp1 = w[i-2, 1:i+1] * s1[0:i]/float(i)
+        tmp2 = w[i-2, 0:i] * s2[n-i:n]/float(i)
+        w[i-1, 1:i+1] = tmp1 + tmp2
+        tmp3 = w[i-1, 1:i+1] + tiny
+        tmp4 = (s2[n-i:n] > s1[0:i])
+        t[i-2, 0:i] = (tmp2 / tmp3) * tmp4 + (1 - tmp1/tmp3) * (numpy.logical_not(tmp4))
+
+    # Shared between callers: make sure nobody changes it.
+    t.setflags(write=False)
+    return t
+
+
+def StaffordRandFixedSum(n, u, nsets, rng=None):
+    """Draw nsets vectors of n values in [0, 1] with sum u, uniformly.
+    rng: random streams of the sets (lib.rng, default: global state)
+    Returns an (nsets, n) array.
+    """
+    #deal with n=1 case
+    if n == 1:
+        return numpy.tile(numpy.array([u]),[nsets,1])
+
+    t = _transition_table(int(n), float(u))
+    k = numpy.floor(u)
+
+    rng = streams(rng)
+    m = nsets
+    x = numpy.zeros((n,m))
+    #draws of set i are in column i
+    draws = rng.random((m, 2*(n-1))).T
+    rt = draws[:n-1] #rand simplex type
+    rs = draws[n-1:] #rand position in simplex
+    s = numpy.repeat(float(u), m)
+    j = numpy.repeat(int(k+1), m)
+    sm = numpy.repeat(0.0, m)
+    pr = numpy.repeat(1.0, m)
+
+    for i in range(n-1,0,-1): #iterate through dimensions
+        e = ( rt[(n-i)-1,...] <= t[i-1,j-1] ) #decide which direction to move in this dimension (1 or 0)
+        sx = rs[(n-i)-1,...] ** (1/float(i)) #next simplex coord
+        sm = sm + (1-sx) * pr * s/float(i+1)
+        pr = sx * pr
+        x[(n-i)-1,...] = sm + pr * e
+        s = s - e
+        j = j - e #change transition table column if required
+
+    x[n-1,...] = sm + pr * s
+
+    #iterated in fixed dimension order but needs to be randomised
+    #permute x row order within each column, all columns at once
+    order = permutations(rng, m, n).T
+    x = numpy.take_along_axis(x, order, axis=0)
+
+    return numpy.transpose(x)
+
+
+def RandFixedSumLarge(n, u, nsets, cap=None, sweeps=None, rng=None):
+    """Draw nsets vectors of n non-negative values with sum u in O(n) memory.
+    Variables:
+    n: number of values (tasks) in each vector
+    u: sum of each vector, may be larger than 1
+    nsets: number of vectors
+    cap: optional upper bound of each value (e.g. 1 for task utilizations)
+    sweeps: number of random walk sweeps for capped rows (default: grows
+            with log(n))
+    rng: random streams of the sets (lib.rng, default: global state)
+    Without cap, normalised exponential draws give the uniform distribution
+    on the simplex exactly. With cap, the rows that respect it are kept as
+    they are; the others are moved into the capped region and mixed by a
+    pairwise random walk (see _pairwise_walk), whose stationary
+    distribution is uniform on the capped simplex. Unlike
+    StaffordRandFixedSum there is no n x n table.
+    Returns an (nsets, n) array.
+    """
+    if cap is not None and u > n * cap:
+        raise ValueError("Utilization %g cannot be split into %d values of at most %g" % (u, n, cap))
+    rng = streams(rng)
+    x = rng.exponential(size=(nsets, n))
+    x *= u / x.sum(axis=1, keepdims=True)
+    if cap is None:
+        return x
+
+    rejected = numpy.flatnonzero(x.max(axis=1) > cap)
+    if rejected.size:
+        if sweeps is None:
+            sweeps = 10 + 2 * int(numpy.ceil(numpy.log2(n)))
+        lower = numpy.zeros(n)
+        upper = numpy.full(n, float(cap))
+        start = _feasible_start(x[rejected], lower, upper, u)
+        x[rejected] = _pairwise_walk(start, lower, upper, sweeps,
+                                     rng.subset(rejected))
+    return x
+
+
+def _feasible_start(x, lower, upper, total):
+    """Move each row of x into {lower <= x <= upper, sum(x) = total}.
+    Values are clipped to the bounds and the missing (or excess) sum is
+    spread over the values in proportion to their remaining room.
+    """
+    x = numpy.clip(x, lower, upper)
+    missing = total - x.sum(axis=1, keepdims=True)
+    room = numpy.where(missing > 0, upper - x, x - lower)
+    room_sum = room.sum(axis=1, keepdims=True)
+    return x + missing * room / numpy.where(room_sum > 0, room_sum, 1.0)
+
+
+def _pairwise_walk(x, lower, upper, sweeps, rng=None):
+    """Random walk on {lower <= x <= upper, sum(x) = const}, row-wise.
+    One sweep pairs the positions at random and redraws each pair uniformly
+    among the values that keep the pair sum and both bounds. Each step
+    leaves the uniform distribution unchanged. Memory and time per sweep
+    are O(n) for every row (plus sorting the random pairing keys).
+    """
+    rng = streams(rng)
+    x = numpy.array(x, dtype=float)
+    m, n = x.shape
+    lower = numpy.broadcast_to(lower, (m, n))
+    upper = numpy.broadcast_to(upper, (m, n))
+    half = n // 2
+    for _ in range(sweeps):
+        # Each row is paired with its own permutation, drawn from the
+        # stream of its set.
+        order = permutations(rng, m, n)
+        a = order[:, :half]
+        b = order[:, half:2 * half]
+        xa = numpy.take_along_axis(x, a, axis=1)
+        xb = numpy.take_along_axis(x, b, axis=1)
+        pair_sum = xa + xb
+        low = numpy.maximum(numpy.take_along_axis(lower, a, axis=1),
+                            pair_sum - numpy.take_along_axis(upper, b, axis=1))
+        high = numpy.minimum(numpy.take_along_axis(upper, a, axis=1),
+                             pair_sum - numpy.take_along_axis(lower, b, axis=1))
+        xa = low + rng.random((m, half)) * (high - low)
+        numpy.put_along_axis(x, a, xa, axis=1)
+        numpy.put_along_axis(x, b, pair_sum - xa, axis=1)
+    return x
+
+
+def RandFixedSumBounded(n, u, nsets, lower=0.0, upper=1.0, sweeps=None,
+                        rng=None):
+    """Draw nsets vectors of n values with sum u and lower <= x <= upper.
+    Variables:
+    n: number of values (tasks) in each vector
+    u: sum of each vector
+    nsets: number of vectors
+    lower: lower bound of each value, a number or one bound per value
+    upper: upper bound of each value, a number or one bound per value
+    sweeps: number of random walk sweeps for rescaled rows (default: grows
+            with log(n))
+    rng: random streams of the sets (lib.rng, default: global state)
+    Dirichlet-rescale style: the part above the lower bounds is drawn
+    uniformly from the simplex for all sets at once. Rows inside the upper
+    bounds are kept (they are uniform on the bounded region). The other
+    rows are rescaled into the bounds and mixed by the pairwise random
+    walk, so no draw is thrown away.
+    Returns an (nsets, n) array.
+    """
+    lower = numpy.broadcast_to(numpy.asarray(lower, dtype=float), (n,))
+    upper = numpy.broadcast_to(numpy.asarray(upper, dtype=float), (n,))
+    if numpy.any(lower > upper) or not lower.sum() <= u <= upper.sum():
+        raise ValueError("Utilization %g cannot be split into %d values within the bounds" % (u, n))
+    room = upper - lower
+    slack = u - lower.sum()
+
+    rng = streams(rng)
+    y = rng.exponential(size=(nsets, n))
+    y *= slack / y.sum(axis=1, keepdims=True)
+    rejected = numpy.flatnonzero(numpy.any(y > room, axis=1))
+    if rejected.size:
+        if sweeps is None:
+            sweeps = 10 + 2 * int(numpy.ceil(numpy.log2(n)))
+        zero = numpy.zeros(n)
+        start = _feasible_start(y[rejected], zero, room, slack)
+        y[rejected] = _pairwise_walk(start, zero, room, sweeps,
+                                     rng.subset(rejected))
+    return lower + y
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Random streams for task set generation.
+SetStreams gives every task set its own counter-based (Philox) stream keyed
+by (seed, set index), so set k can be generated again on its own, without
+generating the sets before it. The generators draw all their random numbers
+with a set as the first axis of `size`; row i of every draw comes from the
+stream of set i. GlobalStream offers the same interface on top of the
+global numpy random state and is used when no streams are given.
+"""
+import numpy as np
+
+
+def set_stream(seed, index, attempt=0):
+    """Counter-based generator of the task set with the given index.
+    attempt numbers the redraws of a rejected set; each attempt starts at
+    its own, far away position of the stream of the set.
+    """
+    # Fold the (possibly long) seed into 64 bits; the set index is the
+    # other half of the 128-bit Philox key.
+    seed_word = int(np.random.SeedSequence(seed).generate_state(1, np.uint64)[0])
+    return np.random.Generator(np.random.Philox(
+        key=(int(index) << 64) | seed_word, counter=int(attempt) << 192))
+
+
+class SetStreams:
+    """One counter-based stream for each task set of a batch."""
+
+    def __init__(self, seed, first=0, count=1, generators=None):
+        """Streams of the sets first, first+1, ..., first+count-1."""
+        if generators is None:
+            generators = [set_stream(seed, index)
+                          for index in range(first, first + count)]
+        self.generators = generators
+
+    @classmethod
+    def of_sets(cls, seed, indices, attempts=None):
+        """Streams of the sets with the given indices (and redraw
+        attempts, default: 0)."""
+        if attempts is None:
+            attempts = [0] * len(indices)
+        return cls(seed, generators=[set_stream(seed, index, attempt)
+                                     for index, attempt
+                                     in zip(indices, attempts)])
+
+    def __len__(self):
+        return len(self.generators)
+
+    def subset(self, rows):
+        """Streams of some of the sets (rows of the batch)."""
+        return SetStreams(None, generators=[self.generators[row] for row in rows])
+
+    def _rows(self, draw, size):
+        size = tuple(np.atleast_1d(size))
+        if size[0] != len(self.generators):
+            raise ValueError("The first axis of size must be the number of task sets")
+        if not self.generators:
+            return np.empty(size)
+        return np.stack([draw(generator, size[1:])
+                         for generator in self.generators])
+
+    def random(self, size):
+        return self._rows(lambda g, s: g.random(s), size)
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        return self._rows(lambda g, s: g.uniform(low, high, s), size)
+
+    def exponential(self, size):
+        return self._rows(lambda g, s: g.exponential(size=s), size)
+
+    def choice(self, a, size, p=None):
+        return self._rows(lambda g, s: g.choice(a, size=s, p=p), size)
+
+
+class GlobalStream:
+    """The global numpy random state with the SetStreams interface."""
+
+    def subset(self, rows):
+        return self
+
+    def random(self, size):
+        return np.random.random(size)
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        return np.random.uniform(low, high, size)
+
+    def exponential(self, size):
+        return np.random.exponential(size=size)
+
+    def choice(self, a, size, p=None):
+        return np.random.choice(a, size=size, p=p)
+
+
+GLOBAL_STREAM = GlobalStream()
+
+
+def streams(rng):
+    """The given streams, or the global random state if rng is None."""
+    return GLOBAL_STREAM if rng is None else rng
+
+
+def permutations(rng, nsets, n):
+    """One random permutation of range(n) for each task set (row)."""
+    return np.argsort(rng.random((nsets, n)), axis=1)
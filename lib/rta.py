@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Response-time analysis of partitioned fixed-priority task sets.
+Every processing element (PE) of every task set is analysed on its own,
+with RM or DM priorities (ties broken by task order), release jitter and
+constrained deadlines (D <= T). The fixed-point iterations of all tasks of
+many task sets run together on padded (group, task) arrays, where a group
+is one PE of one set.
+Preemptive: w = C_i + sum_{j in hp(i)} ceil((w + J_j) / T_j) C_j and
+R_i = J_i + w.
+Non-preemptive, the sufficient test of Davis et al. ("Controller Area
+Network (CAN) schedulability analysis: Refuted, revisited and revised",
+2007) in discrete time: w = max(B_i, C_i) + sum_{j in hp(i)}
+ceil((w + J_j + 1) / T_j) C_j with B_i the largest WCET of a lower
+priority task, and R_i = J_i + w + C_i.
+"""
+import numpy as np
+from lib.task_array import TaskSetArray
+from lib.job_set import RATE_MONOTONIC, DEADLINE_MONOTONIC
+
+
+def as_task_array(task_sets):
+    """The task sets as a TaskSetArray (lists of tasks are converted)."""
+    if isinstance(task_sets, TaskSetArray):
+        return task_sets
+    return TaskSetArray.from_tasksets(task_sets)
+
+
+def priority_groups(task_sets, method=RATE_MONOTONIC, by_pe=True):
+    """Order the rows by (set, PE, priority).
+    Returns the order of the rows, the group (set, PE) of each ordered row,
+    its position (priority) in the group and the start of each group.
+    With by_pe=False a group is a whole set (global scheduling).
+    """
+    if method == RATE_MONOTONIC:
+        key = task_sets.period
+    elif method == DEADLINE_MONOTONIC:
+        key = task_sets.deadline
+    else:
+        raise ValueError("Selected method not valid")
+    sets = task_sets.set_index()
+    rows = np.arange(task_sets.n_tasks)
+    pe = task_sets.pe if by_pe else np.zeros(task_sets.n_tasks, dtype=np.int64)
+    order = np.lexsort((rows, key, pe, sets))
+    new_group = np.ones(order.size, dtype=bool)
+    new_group[1:] = (np.diff(sets[order]) != 0) | (np.diff(pe[order]) != 0)
+    group = np.cumsum(new_group) - 1
+    starts = np.flatnonzero(new_group)
+    return order, group, rows - starts[group], starts
+
+
+def group_tables(task_sets, method=RATE_MONOTONIC, by_pe=True):
+    """Padded (group, priority) tables of the wcet, period, jitter and
+    deadline columns; the padding has no execution time and a period of 1.
+    Returns the tables (a dict by column name), the order, group and
+    position of the rows (see priority_groups) and the mask of the real
+    tasks in the tables.
+    """
+    order, group, position, starts = priority_groups(task_sets, method, by_pe)
+    shape = (starts.size, int(position.max()) + 1 if position.size else 0)
+    tables = {}
+    for name, fill in (('wcet', 0), ('period', 1), ('jitter', 0), ('deadline', 0)):
+        values = np.full(shape, fill, dtype=np.int64)
+        values[group, position] = getattr(task_sets, name)[order]
+        tables[name] = values
+    valid = np.zeros(shape, dtype=bool)
+    valid[group, position] = True
+    return tables, order, group, position, valid
+
+
+def response_times(task_sets, method=RATE_MONOTONIC, preemptive=True,
+                   max_elements=10**6):
+    """Response times of all tasks of all task sets.
+    Variables:
+    task_sets: a TaskSetArray with integer columns, or lists of tasks
+    method: RATE_MONOTONIC or DEADLINE_MONOTONIC (lib.job_set)
+    preemptive: preemptive or non-preemptive scheduling
+    max_elements: size of the (group, task, task) arrays of one step; large
+                  groups are split over their tasks as well
+    Returns an int64 array with one response time per row of task_sets.
+    For a task that misses its deadline the iteration stops early: the
+    value is larger than the deadline, but only a lower bound of the
+    response time.
+    """
+    task_sets = as_task_array(task_sets)
+    response = np.zeros(task_sets.n_tasks, dtype=np.int64)
+    if not task_sets.n_tasks:
+        return response
+    tables, order, group, position, valid = group_tables(task_sets, method)
+    C, T = tables['wcet'], tables['period']
+    J, D = tables['jitter'], tables['deadline']
+    n_groups, size = C.shape
+    if preemptive:
+        base = C
+        tau = 0
+        tail = J
+    else:
+        # Largest WCET of the lower priority tasks of the group.
+        lower = np.zeros_like(C)
+        lower[:, :-1] = np.maximum.accumulate(C[:, :0:-1], axis=1)[:, ::-1]
+        base = np.maximum(lower, C)
+        tau = 1
+        tail = J + C
+
+    R = np.zeros_like(C)
+    chunk = max(1, max_elements // (size * size))
+    for start in range(0, n_groups, chunk):
+        g = slice(start, start + chunk)
+        R[g] = _fixed_point(base[g], C[g], T[g], J[g], D[g], tail[g], tau,
+                            max_elements)
+    response[order] = R[group, position]
+    return response
+
+
+def _fixed_point(base, C, T, J, D, tail, tau, max_elements):
+    """Iterate w = base + interference until every task converged or its
+    response time (w + tail) exceeds its deadline. The tasks k are taken
+    in slices so that the (group, j, k) arrays have at most max_elements
+    elements."""
+    w = base.copy()
+    size = C.shape[1]
+    priority = np.arange(size)
+    active = np.flatnonzero(np.any(w + tail <= D, axis=1))
+    while active.size:
+        a = w[active]
+        Ca, Ja, Ta = C[active], J[active, :, None] + tau, T[active, :, None]
+        # ceil(x / T) = (x + T - 1) // T for x >= 0.
+        Ja += Ta - 1
+        new = base[active].copy()
+        width = max(1, max_elements // (active.size * size))
+        for k in range(0, size, width):
+            tasks = slice(k, k + width)
+            # hp[j, k]: task j has a higher priority than task k.
+            hp = (priority[:, None] < priority[None, tasks]).astype(np.int64)
+            # Jobs of each higher priority task j released in a window of
+            # the length w of task k: ceil((w_k + J_j + tau) / T_j).
+            jobs = a[:, None, tasks] + Ja
+            jobs //= Ta
+            new[:, tasks] += np.einsum('gjk,gj,jk->gk', jobs, Ca, hp)
+        # Tasks past their deadline are not iterated further.
+        new = np.where(a + tail[active] > D[active], a, new)
+        w[active] = new
+        changed = np.any(new != a, axis=1)
+        active = active[changed]
+    return w + tail
+
+
+def schedulable(task_sets, method=RATE_MONOTONIC, preemptive=True):
+    """Whether each task set meets all its deadlines (one bool per set)."""
+    task_sets = as_task_array(task_sets)
+    late = response_times(task_sets, method, preemptive) > task_sets.deadline
+    return np.bincount(task_sets.set_index(), weights=late,
+                       minlength=len(task_sets)) == 0
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""Columnar storage of many task sets.
+All tasks of all sets are kept in flat numpy columns (structure of arrays)
+and set i spans the rows offsets[i]:offsets[i+1]. Row views give the same
+interface as lib.task.task without creating one Python object per task.
+"""
+import csv
+import numpy as np
+from lib.task import task
+
+CSV_HEADER = ['Name', 'Jitter', 'BCET', 'WCET', 'Period', 'Deadline', 'PE']
+
+
+class TaskSetArray:
+    """Structure-of-arrays representation of a collection of task sets."""
+
+    columns = ('jitter', 'bcet', 'wcet', 'period', 'deadline', 'pe')
+
+    def __init__(self, period, wcet, deadline=None, jitter=None, bcet=None,
+                 pe=None, offsets=None, task_id=None, dtype=np.int64):
+        """Create task sets from columns.
+        Variables:
+        period: task periods, flat or one row per task set
+        wcet: worst-case execution times, same shape as period
+        deadline: relative deadlines (default: period)
+        jitter: release jitters (default: 5% of the period as in lib.task)
+        bcet: best-case execution times (default: 60% of the WCET as in
+              lib.task)
+        pe: mapped processing elements (default: 0)
+        offsets: set i spans rows offsets[i]:offsets[i+1] (default: one set
+                 per row of a 2-D period array, or a single set)
+        task_id: number used in the task name 'T<id>' (default: position of
+                 the task in its set)
+        dtype: type of the columns, float for raw generator output
+        """
+        period = np.asarray(period)
+        if offsets is None:
+            if period.ndim == 2:
+                offsets = np.arange(period.shape[0] + 1) * period.shape[1]
+            else:
+                offsets = [0, period.size]
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.period = period.ravel().astype(dtype)
+        self.wcet = np.asarray(wcet).ravel().astype(dtype)
+        self.deadline = self._column(deadline, self.period, dtype)
+        self.jitter = self._column(jitter, np.trunc(self.period * 0.05), dtype)
+        self.bcet = self._column(bcet, np.ceil(self.wcet * 0.6), dtype)
+        self.pe = self._column(pe, np.zeros(self.period.size), np.int64)
+        if task_id is None:
+            task_id = np.arange(self.period.size) - np.repeat(
+                self.offsets[:-1], self.sizes())
+        self.task_id = np.asarray(task_id, dtype=np.int64).ravel()
+
+    @staticmethod
+    def _column(values, default, dtype):
+        if values is None:
+            values = default
+        return np.asarray(values).ravel().astype(dtype)
+
+    @classmethod
+    def from_tasksets(cls, task_sets, dtype=np.int64):
+        """Create the columns from lists of lib.task.task objects."""
+        offsets = np.cumsum([0] + [len(task_set) for task_set in task_sets])
+        tasks = [t for task_set in task_sets for t in task_set]
+        return cls(period=[t.period for t in tasks],
+                   wcet=[t.wcet for t in tasks],
+                   deadline=[t.deadline for t in tasks],
+                   jitter=[t.jitter for t in tasks],
+                   bcet=[t.bcet for t in tasks],
+                   pe=[t.pe for t in tasks],
+                   task_id=[int(t.get_id()) if t.get_id() else i
+                            for task_set in task_sets
+                            for i, t in enumerate(task_set)],
+                   offsets=offsets, dtype=dtype)
+
+    def to_tasksets(self):
+        """Create lists of lib.task.task objects (one per row)."""
+        return [view.to_tasks() for view in self]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.select(range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('task set index out of range')
+        return TaskSetView(self, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield TaskSetView(self, i)
+
+    @property
+    def n_tasks(self):
+        """Total number of tasks in all sets."""
+        return self.period.size
+
+    @property
+    def nbytes(self):
+        """Memory used by the columns."""
+        return sum(getattr(self, name).nbytes
+                   for name in self.columns + ('task_id', 'offsets'))
+
+    def sizes(self):
+        """Number of tasks of each set."""
+        return np.diff(self.offsets)
+
+    def set_index(self):
+        """Index of the task set of each row."""
+        return np.repeat(np.arange(len(self)), self.sizes())
+
+    def utilizations(self):
+        """Utilization of each task."""
+        return self.wcet / self.period
+
+    def set_utilizations(self):
+        """Total utilization of each task set."""
+        return np.bincount(self.set_index(), weights=self.utilizations(),
+                           minlength=len(self))
+
+    def select(self, indices):
+        """Return a new TaskSetArray holding only the given task sets."""
+        indices = np.asarray(indices, dtype=np.int64)
+        sizes = self.sizes()[indices]
+        starts = self.offsets[:-1][indices]
+        rows = np.repeat(starts - np.cumsum(sizes) + sizes, sizes) \
+            + np.arange(sizes.sum())
+        return self.take(rows, np.concatenate(([0], np.cumsum(sizes))))
+
+    def take(self, rows, offsets):
+        """Return a new TaskSetArray made of the given rows and set offsets."""
+        return TaskSetArray(period=self.period[rows], wcet=self.wcet[rows],
+                            deadline=self.deadline[rows],
+                            jitter=self.jitter[rows], bcet=self.bcet[rows],
+                            pe=self.pe[rows], task_id=self.task_id[rows],
+                            offsets=offsets, dtype=self.period.dtype)
+
+
+class TaskSetView:
+    """One task set of a TaskSetArray, behaving like a list of tasks."""
+
+    __slots__ = ('array', 'index', 'start', 'stop')
+
+    def __init__(self, array, index):
+        self.array = array
+        self.index = index
+        self.start = int(array.offsets[index])
+        self.stop = int(array.offsets[index + 1])
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [TaskView(self.array, row) for row in
+                    range(self.start, self.stop)[position]]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError('task index out of range')
+        return TaskView(self.array, self.start + position)
+
+    def __iter__(self):
+        for row in range(self.start, self.stop):
+            yield TaskView(self.array, row)
+
+    def column(self, name):
+        """Numpy view of one column restricted to this task set."""
+        return getattr(self.array, name)[self.start:self.stop]
+
+    def utilization(self):
+        """Total utilization of the task set."""
+        return float(np.sum(self.column('wcet') / self.column('period')))
+
+    def rows(self, mapping=True):
+        """Iterate over the CSV rows of the task set (see task.get_data)."""
+        names = ['T' + str(i) for i in self.column('task_id').tolist()]
+        fields = [self.column(name).tolist() for name in
+                  ('jitter', 'bcet', 'wcet', 'period', 'deadline')]
+        if mapping:
+            fields.append(self.column('pe').tolist())
+        return zip(names, *fields)
+
+    def to_tasks(self):
+        """Create lib.task.task objects for the tasks of this set."""
+        return [task(name=name, jitter=jitter, bcet=bcet, wcet=wcet,
+                     period=period, deadline=deadline, pe=pe)
+                for name, jitter, bcet, wcet, period, deadline, pe
+                in self.rows(mapping=True)]
+
+
+def _field(name):
+    def getter(self):
+        return getattr(self.array, name)[self.row].item()
+
+    def setter(self, value):
+        getattr(self.array, name)[self.row] = value
+
+    return property(getter, setter)
+
+
+class TaskView:
+    """One row of a TaskSetArray with the interface of lib.task.task."""
+
+    __slots__ = ('array', 'row')
+
+    def __init__(self, array, row):
+        self.array = array
+        self.row = row
+
+    jitter = _field('jitter')
+    bcet = _field('bcet')
+    wcet = _field('wcet')
+    period = _field('period')
+    deadline = _field('deadline')
+    pe = _field('pe')
+
+    @property
+    def name(self):
+        return 'T' + str(self.array.task_id[self.row])
+
+    def get_id(self):
+        return str(self.array.task_id[self.row])
+
+    def __str__(self):
+        res = "%-9s PE=%2s BCET=%-5.1f WCET=%-5.1f Period=%7s Deadline=%7s" \
+              % (self.name, self.pe, self.bcet, self.wcet, self.period, self.deadline)
+        return res
+
+    def get_data(self, mapping=False):
+        if (not mapping):
+            return [self.name, self.jitter, self.bcet, self.wcet
+                , self.period, self.deadline]
+        else:
+            return [self.name, self.jitter, self.bcet, self.wcet
+                , self.period, self.deadline, self.pe]
+
+    def __repr__(self):
+        return repr((self.name, self.jitter, self.bcet, self.wcet
+                     , self.period, self.deadline))
+
+
+def read_csv(file):
+    """Read a taskset csv file into a TaskSetArray with one set."""
+    columns = {name: [] for name in CSV_HEADER}
+    with open(file, 'r') as read_obj:
+        csv_dict_reader = csv.DictReader(read_obj)
+        for row in csv_dict_reader:
+            for name in CSV_HEADER:
+                columns[name].append(row[name])
+    return TaskSetArray(period=np.array(columns['Period'], dtype=np.int64),
+                        wcet=np.array(columns['WCET'], dtype=np.int64),
+                        deadline=np.array(columns['Deadline'], dtype=np.int64),
+                        jitter=np.array(columns['Jitter'], dtype=np.int64),
+                        bcet=np.array(columns['BCET'], dtype=np.int64),
+                        pe=np.array(columns['PE'], dtype=np.int64),
+                        task_id=[int(name.replace('T', '')) for name in columns['Name']])
+
+
+def write_csv(file, task_set, mapping=True):
+    """Write one task set (a TaskSetView or a list of tasks) to a taskset
+    csv file."""
+    if isinstance(task_set, TaskSetView):
+        rows = task_set.rows(mapping)
+    else:
+        rows = (t.get_data(mapping) for t in task_set)
+    with open(file, 'w', encoding='UTF8') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER if mapping else CSV_HEADER[:-1])
+        writer.writerows(rows)
@@ -1,8 +1,10 @@
 """Transform task from dictionaries to task objects for the event simulator.
 Some part adapted from https://github.com/tu-dortmund-ls12-rt/end-to-end
 """
-import lib.task as t
-from scipy import stats
+from lib.task_array import TaskSetArray
+import lib.partition as partition
+import numpy as np
+from lib.rng import streams
 
 
 class Transformer:
@@ -13,84 +15,101 @@ class Transformer:
         self.task_sets = t_task_sets  # task set as dictionary
         self.time_scale = time_scale  # scaling factor for period, WCET, etc.
 
-    def transform_tasks(self, jitter, n_PE=1, mapping=0):
+    def transform_tasks(self, jitter=False, n_PE=1, mapping=0, floor_wcet=False,
+                        set_indices=None, failed=None, rng=None):
         """Transform the given tasks.
         The flag jitter specifies if jitters should be introduced to the task
-        set.
+        set (off by default).
         - set jitter
+        - rng: random streams of the sets for the jitters (lib.rng, default:
+          global state)
         - number of PE
-        - mapping policy (0 -> not changing, 1 -> worst-fit, 2 -> first-fit , 3 -> best-fit [Not implemented yet])
+        - mapping policy (0 -> not changing, 1 -> worst-fit, 2 -> first-fit, 3 -> best-fit, 4 -> next-fit; see lib.partition)
+        - floor_wcet: WCET = floor(utilization * scaled period) (at least 1)
+          instead of the rounded WCET, so that rounding never increases
+          the utilization of a task
+        - set_indices: index of each set in the experiment, named when a set
+          cannot be mapped
+        - failed: if a list, the sets that cannot be mapped are appended to
+          it instead of raising lib.partition.PartitioningError
+        Lists of task objects are transformed as a TaskSetArray and come
+        back as lists of lib.task.task objects.
         """
-        # Distribution of task jitters
-        distribution_jitter = stats.uniform()
+        if isinstance(self.task_sets, TaskSetArray):
+            return self.transform_task_array(n_PE=n_PE, mapping=mapping,
+                                             jitter=jitter, floor_wcet=floor_wcet,
+                                             set_indices=set_indices, failed=failed,
+                                             rng=rng)
+        task_sets = TaskSetArray.from_tasksets(self.task_sets, dtype=float)
+        transformer = Transformer(task_sets, self.time_scale)
+        return transformer.transform_task_array(
+            n_PE=n_PE, mapping=mapping, jitter=jitter,
+            floor_wcet=floor_wcet, set_indices=set_indices,
+            failed=failed, rng=rng).to_tasksets()
 
-        # Initialization of the transformed task sets
-        transformed_task_sets = []
-        PE_util = [1] * n_PE
-        for task_set in self.task_sets:
-            # Sort tasks set by periods.
-            sorted_task_set = sorted(task_set, key=lambda task: task.period)
-            transformed_task_set = []
+    def transform_task_array(self, n_PE=1, mapping=0, jitter=False,
+                             floor_wcet=False, set_indices=None, failed=None,
+                             rng=None):
+        """Transform a TaskSetArray without creating task objects.
+        Tasks are sorted by period and named by their position, values are
+        rounded to two decimals and scaled (a WCET of 0 becomes 1; see
+        transform_tasks for floor_wcet), and the tasks are mapped; the
+        result is a TaskSetArray with integer columns.
+        With jitter, the jitter column is drawn uniformly from [0, 1000) from
+        the stream of each set (rng) and scaled like the other values;
+        otherwise it is 5% of the period. (The jitter of lib.task.task
+        objects is always 5% of the period.)
+        """
+        task_sets = self.task_sets
+        if jitter:
+            # The first n_k draws of set k (in period order), so that a set
+            # does not depend on the size of the other sets.
+            sizes = np.diff(task_sets.offsets)
+            draws = streams(rng).random((len(task_sets), int(sizes.max(initial=0))))
+            jitter = self.scale(draws[np.arange(draws.shape[1]) < sizes[:, None]] * 1000)
+        else:
+            jitter = None
+        # Sort each task set by period (stable, like sorted()).
+        order = np.lexsort((task_sets.period, task_sets.set_index()))
+        period = self.scale(task_sets.period[order])
+        if floor_wcet:
+            utilizations = (task_sets.wcet / task_sets.period)[order]
+            wcet = np.floor(utilizations * period).astype(np.int64)
+        else:
+            wcet = self.scale(task_sets.wcet[order])
+        wcet[wcet == 0] = 1
+        deadline = self.scale(task_sets.deadline[order])
+        pe = task_sets.pe[order]
+
+        if mapping:
+            # Each set on its own, with the unrounded utilizations.
+            utilizations = (task_sets.wcet / task_sets.period)[order]
+            pe = partition.partition_sets(utilizations, task_sets.offsets,
+                                          n_PE, mapping, set_indices, failed)
 
-            # Transform each task individually.
-            for i, task in enumerate(sorted_task_set):
-                # Set jitter.
-                if jitter:
-                    jitter = int(float(format(distribution_jitter.rvs() * 1000,
-                                             ".2f")) * self.time_scale)
-                else:
-                    jitter = 0
-                # Scale values and make a task object.
-                if (mapping == 0):
-                    transformed_task_set.append(
-                        t.task(name='T' + str(i), jitter=jitter,
-                               wcet=(int(float(format(task.wcet, ".2f"))
-                                         * self.time_scale)
-                                     if int(float(format(task.wcet, ".2f"))
-                                            * self.time_scale) else int(float(format(task.wcet, ".2f"))
-                                                                        * self.time_scale) + 1),
-                               period=int(float(format(task.period, ".2f"))
-                                          * self.time_scale),
-                               pe=task.pe,
-                               deadline=int(float(format(task.deadline, ".2f"))
-                                            * self.time_scale)))
-                elif (mapping == 1):
-                    max_index = PE_util.index(max(PE_util))
-                    u = (task.wcet / task.period)
-                    task.pe = max_index
-                    PE_util[task.pe] -= u
-                    transformed_task_set.append(
-                        t.task(name='T' + str(i), jitter=jitter,
-                               wcet=(int(float(format(task.wcet, ".2f"))
-                                         * self.time_scale)
-                                     if int(float(format(task.wcet, ".2f"))
-                                            * self.time_scale) else int(float(format(task.wcet, ".2f"))
-                                                                        * self.time_scale) + 1),
-                               period=int(float(format(task.period, ".2f"))
-                                          * self.time_scale),
-                               pe=task.pe,
-                               deadline=int(float(format(task.deadline, ".2f"))
-                                            * self.time_scale)))
-                elif (mapping == 2):
-                    first_index = 0
-                    u = (task.wcet / task.period)
-                    for j in range (n_PE):
-                        if (PE_util[first_index]- u >= 0):
-                            break
-                        first_index+=1
-                    task.pe = first_index
-                    PE_util[task.pe] -= u
-                    transformed_task_set.append(
-                        t.task(name='T' + str(i), jitter=jitter,
-                               wcet=(int(float(format(task.wcet, ".2f"))
-                                         * self.time_scale)
-                                     if int(float(format(task.wcet, ".2f"))
-                                            * self.time_scale) else int(float(format(task.wcet, ".2f"))
-                                                                        * self.time_scale) + 1),
-                               period=int(float(format(task.period, ".2f"))
-                                          * self.time_scale),
-                               pe=task.pe,
-                               deadline=int(float(format(task.deadline, ".2f"))
-                                            * self.time_scale)))
-            transformed_task_sets.append(transformed_task_set)
-        return transformed_task_sets
+        return TaskSetArray(period=period, wcet=wcet, deadline=deadline,
+                            jitter=jitter, pe=pe, offsets=task_sets.offsets)
+
+    def scale(self, values):
+        """Round values to two decimals and scale them to integers.
+        Same result as int(float(format(x, ".2f")) * time_scale) for every
+        value: x * 100 is rounded with np.rint, except where the product is
+        too close to a tie (or too large) for its rounding error to be
+        ruled out; those values go through format() as before.
+        """
+        values = np.asarray(values, dtype=float)
+        with np.errstate(invalid='ignore', over='ignore'):
+            hundredths = values * 100
+            # The product is off by at most half a unit in the last place.
+            unsure = ~(np.abs(hundredths) < 2 ** 52) \
+                | (np.abs(hundredths - np.floor(hundredths) - 0.5)
+                   <= 2 * np.spacing(np.abs(hundredths)))
+            # k / 100 is the float nearest to the decimal string "k/100".
+            scaled = np.trunc(np.rint(hundredths) / 100 * self.time_scale)
+            # Out of the int64 range: let the conversion fail as before.
+            unsure |= ~(np.abs(scaled) < 2 ** 63)
+        result = np.zeros(values.shape, dtype=np.int64)
+        result[~unsure] = scaled[~unsure]
+        result[unsure] = [int(float(format(x, ".2f")) * self.time_scale)
+                          for x in values[unsure].tolist()]
+        return result
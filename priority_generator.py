@@ -7,35 +7,34 @@ Usage:
 
 Options:
     --taskset FILE, -t FILE          taskset csv file [default: taskset-0.csv]
-    --method=N, -m N                 priority assigning method (0: Rate-monotonic,1: Deadline-monotonic,2: Earliest deadline first (EDF)) [default: 0]
+    --method=N, -m N                 priority assigning method (0: Rate-monotonic,1: Deadline-monotonic,2: Earliest deadline first (EDF),3: All of them in one pass) [default: 0]
     --sag, -s                        generate with SAG format
+    --predict                        only print the hyperperiod, the number of jobs and the size of the job set file
     --version, -v                    show version and exit
     --help, -h                       show this message
 """
 
 import sys
 import os
-from math import ceil, floor, gcd
+from math import ceil, floor
 from random import randint
 from lxml import etree as ET
-import lib.task as task
-import lib.job as job
+import lib.task_array as task_array
+import lib.job_set as lazy_jobs
+import lib.hyperperiod as hyperperiods
+import lib.edf as edf
 import re
 from docopt import docopt
 import csv
 
 
 ## calculate least common multiple of two number
-def lcm(a, b):
-    return abs(a * b) // gcd(a, b) if a and b else 0
+lcm = hyperperiods.lcm
 
 
 ## calculate hyperperiod of a taskset
 def cal_hyperperiod(task_set):
-    h = 1
-    for t in task_set:
-        h = lcm(h, t.period)
-    return h
+    return hyperperiods.hyperperiod(t.period for t in task_set)
 
 
 ## generate priority of a taskset (JLFP)
@@ -45,46 +44,20 @@ def generate_priority(task_set, hyperperiod, method=0):
     0 -> Rate-monotonic
     1 -> Deadline-monotonic
     2 -> The Earliest deadline first (EDF)
+    Returns a lazy job set (lib.job_set.JobSetView): the jobs are only
+    computed when they are accessed or written.
     """
-    job_set = []
-    for t in task_set:
-        for i in range(hyperperiod // t.period):
-            job_set.append(
-                job.job(name=t.name, jitter=t.jitter, bcet=t.bcet, wcet=t.wcet, period=t.period, deadline=t.deadline,
-                        pe=t.pe, instance_num=i))
-    if (method == 0):
-        sorted_job_set = sorted(job_set, key=lambda job: job.period)
-        for priority, j in enumerate(sorted_job_set):
-            j.priority = priority
-    elif (method == 1):
-        sorted_job_set = sorted(job_set, key=lambda job: job.deadline)
-        for priority, j in enumerate(sorted_job_set):
-            j.priority = priority
-    elif (method == 2):
-        sorted_job_set = sorted(job_set, key=lambda job: job.absolute_deadline)
-        for priority, j in enumerate(sorted_job_set):
-            j.priority = priority
-    else:
-        print("Selected method not valid")
+    try:
+        return lazy_jobs.JobSetView(task_set, hyperperiod, method)
+    except ValueError as e:
+        print(e)
         sys.exit(1)
-    sorted_job_set = sorted(sorted_job_set, key=lambda job: job.job_name)
-    # for priority, j in enumerate(sorted_job_set):
-    #     print(j)
-    return sorted_job_set
 
 
 def read_csv(file):
-    taskset = []
     try:
-        with open(file, 'r') as read_obj:
-            # csv_reader = csv.reader(read_obj)
-            csv_dict_reader = csv.DictReader(read_obj)
-            # Iterate over each row in the csv using reader object and make tasks
-            for row in csv_dict_reader:
-                taskset.append(
-                    task.task(name=row['Name'], jitter=int(row['Jitter']), bcet=int(row['BCET']), wcet=int(row['WCET']),
-                              period=int(row['Period']), deadline=int(row['Deadline']), pe=int(row['PE'])))
-        return taskset
+        # One set of a TaskSetArray: tasks are row views, not objects.
+        return task_array.read_csv(file)[0]
     except Exception as e:
         print(e)
         print("ERROR: reading taskset is not possible")
@@ -93,20 +66,34 @@ def read_csv(file):
 
 def write_csv(job_set, taskset_name, sag_format=False):
     try:
-        if not sag_format:
-            header = ['Name', 'Arrival min.', 'Arrival max.', 'BCET', 'WCET', 'Abs. deadline', 'PE', 'Priority']
-            with open("jobset-" + taskset_name + '.csv', 'w', encoding='UTF8') as f:
-                writer = csv.writer(f)
-                writer.writerow(header)
-                for j in job_set:
-                    writer.writerow(j.get_data(mapping=True))
-        else:
-            header = ['Task ID', 'Job ID', 'Arrival min', 'Arrival max', 'Cost min', 'Cost max', 'Deadline', 'Priority']
-            with open("jobset-" + taskset_name + '.csv', 'w', encoding='UTF8') as f:
-                writer = csv.writer(f)
+        header = lazy_jobs.SAG_CSV_HEADER if sag_format else lazy_jobs.JOB_CSV_HEADER
+        with open("jobset-" + taskset_name + '.csv', 'w', encoding='UTF8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(job_set.rows(mapping=True, sag_format=sag_format))
+    except Exception as e:
+        print(e)
+        print("ERROR: save")
+        sys.exit(1)
+
+
+def write_all_csv(job_set, taskset_name, sag_format=False):
+    """Write the job sets of all methods (jobset-<taskset>-rm.csv, -dm.csv
+    and -edf.csv) in one pass over the jobs."""
+    try:
+        header = lazy_jobs.SAG_CSV_HEADER if sag_format else lazy_jobs.JOB_CSV_HEADER
+        files = [open("jobset-" + taskset_name + '-' + lazy_jobs.METHOD_NAMES[method] + '.csv', 'w',
+                      encoding='UTF8') for method in lazy_jobs.METHODS]
+        try:
+            writers = [csv.writer(f) for f in files]
+            for writer in writers:
                 writer.writerow(header)
-                for j in job_set:
-                    writer.writerow(j.get_data(mapping=False, sag_format=True))
+            for chunk in job_set.rows_by_method(lazy_jobs.METHODS, mapping=True, sag_format=sag_format):
+                for writer, rows in zip(writers, chunk):
+                    writer.writerows(rows)
+        finally:
+            for f in files:
+                f.close()
     except Exception as e:
         print(e)
         print("ERROR: save")
@@ -118,9 +105,31 @@ def main():
     task_set = read_csv(args['--taskset'])
     hyperperiod = cal_hyperperiod(task_set)
     taskset_name = os.path.splitext(os.path.basename(args['--taskset']))[0]
-    job_set = generate_priority(task_set, hyperperiod, int(args['--method']))
+    method = int(args['--method'])
     sag_format = args['--sag']
-    write_csv(job_set, taskset_name, sag_format)
+    if args['--predict']:
+        # Python integers: H and the job count may not fit in 64 bits.
+        periods = hyperperiods.periods_of(task_set)
+        print("Hyperperiod: " + str(hyperperiod))
+        print("Jobs: " + str(hyperperiods.job_count(periods, hyperperiod)))
+        try:
+            job_set = lazy_jobs.JobSetView(task_set, hyperperiod)
+            size = job_set.csv_size(mapping=True, sag_format=sag_format)
+            print("Job set file size: %d bytes%s" % (size, " (each)" if method == 3 else ""))
+        except OverflowError:
+            # The job counts of the view are int64.
+            print("Job set file size: too large")
+        if method in (2, 3):
+            # Each PE on its own, as the PE column of the jobs.
+            feasible = edf.schedulable([list(task_set)])[0]
+            print("EDF demand-bound test: " + ("schedulable" if feasible else "not schedulable"))
+    elif method == 3:
+        # The jobs are expanded once and shared by the three methods.
+        job_set = generate_priority(task_set, hyperperiod)
+        write_all_csv(job_set, taskset_name, sag_format)
+    else:
+        job_set = generate_priority(task_set, hyperperiod, method)
+        write_csv(job_set, taskset_name, sag_format)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Move the periods of existing tasksets to nearby values with a short hyperperiod.
+Only 7-smooth hyperperiods (2^a 3^b 5^c 7^d) are searched: the result is the
+shortest of them, not necessarily the shortest hyperperiod within the
+tolerance (a hyperperiod with another prime factor may be shorter).
+
+Usage:
+    snap_periods                [options] FILE...
+
+Options:
+    --tolerance=N, -t N                 maximum change of a period in percent  [default: 10]
+    --max-utilization=N, -u N           bound of the total utilization of a snapped taskset in percent  [default: 100]
+    --output DIR, -o DIR                directory of the snapped taskset files  [default: snapped]
+    --version, -v                       show version and exit
+    --help, -h                          show this message
+"""
+
+import sys
+import os
+from math import ceil, floor
+import numpy as np
+from docopt import docopt
+import lib.task_array as task_array
+import lib.hyperperiod as hyperperiods
+from lib.periods import smooth_numbers
+
+# Largest hyperperiod tried; the candidates are 7-smooth numbers and must
+# fit in 64-bit integers.
+search_limit = 10 ** 18
+
+
+def period_windows(periods, wcets, tolerance):
+    """Range of the periods each task may get.
+    Variables:
+    periods: original periods
+    wcets: worst-case execution times (a period never gets below them)
+    tolerance: maximum relative change of a period (0.1 -> 10%)
+    """
+    low = [max(1, int(c), ceil(p * (1 - tolerance))) for p, c in zip(periods, wcets)]
+    high = [floor(p * (1 + tolerance)) for p in periods]
+    return np.array(low, dtype=np.int64), np.array(high, dtype=np.int64)
+
+
+def snap_periods(periods, wcets, tolerance, max_utilization, smooth=None):
+    """Periods within the tolerance whose hyperperiod is as short as possible.
+    The hyperperiod H is searched among the 7-smooth numbers in ascending
+    order; every task gets the largest divisor of H in its window, which
+    gives the smallest utilization for this H. The first H whose tasks all
+    have a divisor and whose utilization is at most max_utilization wins.
+    Variables:
+    periods: original periods
+    wcets: worst-case execution times
+    tolerance: maximum relative change of a period (0.1 -> 10%)
+    max_utilization: bound of the total utilization (1.0 -> 100%)
+    smooth: sorted 7-smooth numbers to try (default: all up to search_limit)
+    Returns the new periods, or None if no H shorter than the original
+    hyperperiod is found.
+    """
+    if smooth is None:
+        smooth = np.array(smooth_numbers(search_limit), dtype=np.int64)
+    low, high = period_windows(periods, wcets, tolerance)
+    if np.any(low > high):
+        return None
+    wcets = np.asarray(wcets, dtype=float)
+    limit = hyperperiods.hyperperiod(periods, search_limit)
+    # Only smooth numbers up to the largest window can be periods.
+    divisors = smooth[smooth <= high.max()]
+    start = np.searchsorted(smooth, low.max())
+    for h in smooth[start:].tolist():
+        if h >= limit:
+            break
+        candidates = divisors[h % divisors == 0]
+        chosen = candidates[np.searchsorted(candidates, high, side='right') - 1]
+        if np.any(chosen < low):
+            continue
+        if np.sum(wcets / chosen) <= max_utilization:
+            return chosen
+    return None
+
+
+def snap_taskset(file, output, tolerance, max_utilization, smooth):
+    try:
+        task_sets = task_array.read_csv(file)
+    except Exception as e:
+        print(e)
+        print("ERROR: reading taskset is not possible")
+        sys.exit(1)
+    task_set = task_sets[0]
+    utilization_before = task_set.utilization()
+    periods = task_set.column('period').tolist()
+    before = hyperperiods.hyperperiod(periods)
+    jobs_before = hyperperiods.job_count(periods, before)
+    new_periods = snap_periods(periods, task_set.column('wcet').tolist(),
+                               tolerance, max_utilization, smooth)
+    if new_periods is not None:
+        # Implicit deadlines follow the period, the others are kept but
+        # never exceed the new period.
+        deadline = task_set.column('deadline')
+        implicit = deadline == task_set.column('period')
+        deadline[:] = np.where(implicit, new_periods,
+                               np.minimum(deadline, new_periods))
+        task_set.column('period')[:] = new_periods
+        periods = new_periods.tolist()
+    after = hyperperiods.hyperperiod(periods)
+    jobs_after = hyperperiods.job_count(periods, after)
+    task_array.write_csv(os.path.join(output, os.path.basename(file)), task_set)
+    print("%s: hyperperiod %d -> %d, jobs %d -> %d, utilization %.4f -> %.4f%s"
+          % (file, before, after, jobs_before, jobs_after,
+             utilization_before, task_set.utilization(),
+             "" if new_periods is not None else " (unchanged)"))
+    return jobs_before, jobs_after
+
+
+def main():
+    args = docopt(__doc__, version='0.1.0')
+    tolerance = float(args['--tolerance']) / 100.0
+    max_utilization = float(args['--max-utilization']) / 100.0
+    output = args['--output']
+    os.makedirs(output, exist_ok=True)
+    smooth = np.array(smooth_numbers(search_limit), dtype=np.int64)
+    total_before = total_after = 0
+    for file in args['FILE']:
+        jobs_before, jobs_after = snap_taskset(file, output, tolerance,
+                                               max_utilization, smooth)
+        total_before += jobs_before
+        total_after += jobs_after
+    print("Total jobs: %d -> %d" % (total_before, total_after))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,30 +8,69 @@ Usage:
 Options:
     --round, -r                         round the numbers [default: False]
     --utilization=N, -u N               system utilization in percent  [default: 50]
-    --generator=N, -g N                 task generation algorithm (0: WATERS 1: UUniFast 2: Emberson 3:WATERS (fixed-sum))  [default: 1]
-    --mapping=N, -m N                   the mapping algorithm of taskset (0: No mapping 1: Worst-fit 2: First-fit) [default: 0]
+    --generator=N, -g N                 task generation algorithm (0: WATERS 1: UUniFast 2: Emberson 3:WATERS (fixed-sum) 4: Scalable fixed-sum 5: Bounded fixed-sum)  [default: 1]
+    --mapping=N, -m N                   the mapping algorithm of taskset (0: No mapping 1: Worst-fit 2: First-fit 3: Best-fit 4: Next-fit) [default: 0]
     --ntask=N, -n N                     number of tasks in one taskset  [default: 15]
     --nset=N, -s N                      number of tasksets to generate  [default: 1]
+    --block=N, -b N                     number of tasksets generated with one call of the generator  [default: 100]
+    --jobs=N, -j N                      number of worker processes  [default: 1]
+    --seed=N                            master seed of the random streams (random if not given)
+    --index=K                           only generate task set K of the seed (requires --seed)
+    --resume                            keep the complete taskset files of an earlier run with the same --seed
+    --max-jobs=N                        draw again the task sets with more than N jobs in their hyperperiod
+    --max-hyperperiod=N                 draw again the task sets with a longer hyperperiod
     --npe=N, -p N                       number of processing elements  [default: 4]
+    --partitioned                       draw the utilization of each processing element on its own and map its tasks there (generator 1)
+    --cap=N                             maximum utilization of one task in percent (generators 4 and 5)  [default: 100]
+    --floor=N                           minimum utilization of one task in percent (generator 5)  [default: 0]
+    --packing=N                         merge WATERS runnables with the same period into --ntask tasks (0: No merging 1: First-fit 2: Balanced) [default: 0]
+    --period-dist=N                     period distribution of generators 1, 2, 4 and 5 (0: Log-uniform 1: Hyperperiod-bounded) [default: 0]
+    --hyperperiod-bound=N               bound of the hyperperiod of each taskset with --period-dist 1  [default: 1000000]
+    --filter=NAME                       draw again the task sets that fail a test (schedulable: response-time or demand-bound analysis of each PE,
+                                        global-schedulable, global-unknown, global-unschedulable: label of the global tests on --npe processors)
+    --policy=N                          scheduling policy of --filter (0: RM 1: DM 2: Non-preemptive RM 3: Non-preemptive DM 4: EDF) [default: 0]
     --version, -v                       show version and exit
     --help, -h                          show this message
 """
+import os
 import sys
+import multiprocessing
 
 import lib.generator_WATERS as waters
 import lib.generator_UUNIFAST as uunifast
 import lib.generator_Emberson as emberson
 import lib.generator_WATERS_fixedsum as waters_fs
+import lib.generator_ScalableFixedSum as scalable_fs
+import lib.generator_BoundedFixedSum as bounded_fs
 import lib.task as task
+import lib.task_array as task_array
+import lib.hyperperiod as hyperperiods
 import lib.transformer as trans
+import lib.partition as partition
+import lib.rta as rta
+import lib.edf as edf
+import lib.global_tests as global_tests
+from lib.job_set import RATE_MONOTONIC, DEADLINE_MONOTONIC, EDF
+from lib.rng import SetStreams
 
 from docopt import docopt
-import csv
+import numpy as np
 
 debug_flag = False  # flag to have breakpoint() when errors occur
-
-
-def generate_taskset(args):
+max_redraws = 1000  # draws of one task set before giving up on the mapping, the job limits and --filter
+# (priorities, preemptive) of each --policy of --filter
+filter_policies = {0: (RATE_MONOTONIC, True), 1: (DEADLINE_MONOTONIC, True),
+                   2: (RATE_MONOTONIC, False), 3: (DEADLINE_MONOTONIC, False),
+                   4: (EDF, True)}
+
+
+def generate_taskset(args, n_set=1, rng=None, indices=None, failed=None):
+    """Generate n_set task sets with one call of the selected generator.
+    rng: random streams of the sets (lib.rng, default: global state)
+    indices: index of each set in the experiment (named by the mapping)
+    failed: if a list, the indices of the sets that cannot be mapped are
+    appended to it instead of stopping the generator
+    """
     ###
     # Task set generation.
     ###
@@ -42,6 +81,13 @@ def generate_taskset(args):
     round_c = args['--round']
     n_PE = int(args['--npe'])
     mapping = int(args['--mapping'])
+    packing = [None, 'first-fit', 'balanced'][int(args['--packing'])]
+    # Hyperperiod bound of the periods (output time units); generators
+    # with a time scale get the bound divided by it.
+    if int(args['--period-dist']) == 1:
+        h_bound = int(args['--hyperperiod-bound'])
+    else:
+        h_bound = None
 
     try:
         if int(args['--generator']) == 0:
@@ -61,15 +107,14 @@ def generate_taskset(args):
             # Create task sets from the generator.
             # Each task is a dictionary.
             print("\tCreate task sets.")
-            task_sets_waters = []
-            while len(task_sets_waters) < 1:
-                task_sets_gen = waters.gen_tasksets(
-                    1, n_task, req_uti, profile, True, threshold / 100.0, 4, False)
-                task_sets_waters.append(task_sets_gen[0])
-                # Transform tasks to fit framework structure.
-                # Each task is an object of utilities.task.Task.
+            task_sets_waters = waters.gen_tasksets(
+                n_set, n_task, req_uti, profile, True, threshold / 100.0, 4,
+                packing is not None, packing, rng=rng)
+            # Transform tasks to fit framework structure.
+            # Each task is an object of utilities.task.Task.
             trans1 = trans.Transformer(task_sets_waters, 100)
-            task_sets = trans1.transform_tasks(False, n_PE=n_PE, mapping=mapping)
+            task_sets = trans1.transform_tasks(False, n_PE=n_PE, mapping=mapping,
+                                               set_indices=indices, failed=failed)
             return task_sets
 
         elif int(args['--generator']) == 1:
@@ -83,8 +128,24 @@ def generate_taskset(args):
             # UUniFast benchmark without predefined periods.
 
             # # Generate log-uniformly distributed task sets:
-            task_sets_uunifast = uunifast.gen_tasksets(
-                n_task, 1, 1, 100, req_uti, rounded=round_c)
+            if args['--partitioned']:
+                # Mapped by construction: no set can fail the mapping. The
+                # WCETs are floored below, and generate_block draws again
+                # the rare sets with a PE above 1 after scaling.
+                task_sets_uunifast = uunifast.gen_taskset_array_partitioned(
+                    n_task, n_set, n_PE, 1, 100, req_uti, rounded=round_c, rng=rng,
+                    max_hyperperiod=None if h_bound is None else h_bound // 100)
+            elif req_uti <= 1:
+                task_sets_uunifast = uunifast.gen_taskset_array(
+                    n_task, n_set, 1, 100, req_uti, rounded=round_c, rng=rng,
+                    max_hyperperiod=None if h_bound is None else h_bound // 100)
+            else:
+                # Multi-core utilization: UUniFast-Discard drops the sets
+                # with a task utilization above 1.
+                task_sets_uunifast, acceptance_rate = uunifast.gen_taskset_array_discard(
+                    n_task, n_set, 1, 100, req_uti, rounded=round_c, rng=rng,
+                    max_hyperperiod=None if h_bound is None else h_bound // 100)
+                print("\tUUniFast-Discard acceptance rate: %.4f%%" % (100 * acceptance_rate))
 
             # Generate log-uniformly distributed task sets with predefined
             # periods:
@@ -98,7 +159,9 @@ def generate_taskset(args):
             #     n_task, 1, min_pull, max_pull, req_uti, periods)
 
             trans2 = trans.Transformer(task_sets_uunifast, 100)
-            task_sets = trans2.transform_tasks(False, n_PE=n_PE, mapping=mapping)
+            task_sets = trans2.transform_tasks(False, n_PE=n_PE, mapping=mapping,
+                                               floor_wcet=args['--partitioned'],
+                                               set_indices=indices, failed=failed)
             return task_sets
 
         elif int(args['--generator']) == 2:
@@ -108,10 +171,12 @@ def generate_taskset(args):
             # Create task sets from the generator.
             print("\tCreate task sets.")
 
-            task_set_emberson = emberson.gen_tasksets(n=n_task, u=req_uti, nsets=1, permin=10, permax=100, gran=5,
-                                                      round_C=round_c, dist="logunif")
+            task_set_emberson = emberson.gen_taskset_array(n=n_task, u=req_uti, nsets=n_set, permin=10, permax=100, gran=5,
+                                                      round_C=round_c, dist="logunif", rng=rng,
+                                                      max_hyperperiod=h_bound)
             trans3 = trans.Transformer(task_set_emberson, 1)
-            task_sets = trans3.transform_tasks(jitter=False, n_PE=n_PE, mapping=mapping)
+            task_sets = trans3.transform_tasks(jitter=False, n_PE=n_PE, mapping=mapping,
+                                               set_indices=indices, failed=failed)
             return task_sets
         elif int(args['--generator']) == 3:
             # WATERS benchmark with fixed-sum utilization
@@ -130,17 +195,48 @@ def generate_taskset(args):
             # Create task sets from the generator.
             # Each task is a dictionary.
             print("\tCreate task sets.")
-            task_sets_waters = []
-            while len(task_sets_waters) < 1:
-                task_sets_gen = waters_fs.gen_tasksets(
-                    1, n_task, req_uti, profile, True, threshold / 100.0, 4, True)
-                task_sets_waters.append(task_sets_gen[0])
+            task_sets_waters = waters_fs.gen_tasksets(
+                n_set, n_task, req_uti, profile, True, threshold / 100.0, 4, True, rng=rng)
             # Transform tasks to fit framework structure.
             # Each task is an object of utilities.task.Task.
             trans4 = trans.Transformer(task_sets_waters, 100)
-            task_sets = trans4.transform_tasks(jitter=False, n_PE=n_PE, mapping=mapping)
+            task_sets = trans4.transform_tasks(jitter=False, n_PE=n_PE, mapping=mapping,
+                                               set_indices=indices, failed=failed)
+            return task_sets
+
+        elif int(args['--generator']) == 4:
+            # Fixed-sum utilizations for very large task sets.
+            print("Scalable fixed-sum task set generator.")
+
+            # Create task sets from the generator.
+            print("\tCreate task sets.")
+
+            # Periods from 10 to 100 (ms) in microseconds, so that the small
+            # execution times of thousands of tasks are not rounded to 0.
+            task_sets_fs = scalable_fs.gen_taskset_array(
+                n=n_task, u=req_uti, nsets=n_set, permin=10000, permax=100000, gran=1000,
+                round_C=round_c, dist="logunif", cap=float(args['--cap']) / 100.0, rng=rng,
+                max_hyperperiod=h_bound)
+            trans5 = trans.Transformer(task_sets_fs, 1)
+            task_sets = trans5.transform_tasks(jitter=False, n_PE=n_PE, mapping=mapping,
+                                               set_indices=indices, failed=failed)
             return task_sets
+        elif int(args['--generator']) == 5:
+            # Fixed-sum utilizations with per-task bounds.
+            print("Bounded fixed-sum task set generator.")
+
+            # Create task sets from the generator.
+            print("\tCreate task sets.")
 
+            # Same periods as the scalable fixed-sum generator (microseconds).
+            task_sets_bounded = bounded_fs.gen_taskset_array(
+                n=n_task, u=req_uti, nsets=n_set, permin=10000, permax=100000, gran=1000,
+                round_C=round_c, dist="logunif", lower=float(args['--floor']) / 100.0,
+                upper=float(args['--cap']) / 100.0, rng=rng, max_hyperperiod=h_bound)
+            trans6 = trans.Transformer(task_sets_bounded, 1)
+            task_sets = trans6.transform_tasks(jitter=False, n_PE=n_PE, mapping=mapping,
+                                               set_indices=indices, failed=failed)
+            return task_sets
         else:
             print("Choose a benchmark")
             return
@@ -154,41 +250,154 @@ def generate_taskset(args):
             sys.exit(1)
 
 
-def main():
-    args = docopt(__doc__, version='0.9.1')
-    n_gen = 0
-    task_sets = []
+def generate_block(args, indices, seed):
+    """Generate the task sets with the given indices and save each one.
+    Every set has its own counter-based random stream, so the sets do not
+    depend on the block size, the number of jobs or the other sets.
+    Sets that cannot be mapped with --mapping, whose job set exceeds
+    --max-jobs or --max-hyperperiod, that fail --filter, or that load a PE
+    above 1 with --partitioned (after scaling), are drawn again from the
+    next attempt of their stream.
+    Returns the number of saved sets.
+    """
+    max_jobs = optional_int(args['--max-jobs'])
+    max_hyperperiod = optional_int(args['--max-hyperperiod'])
+    attempts = dict.fromkeys(indices, 0)
+    unmapped = 0
+    pending = list(indices)
+    while pending:
+        failed = []
+        try:
+            task_sets = generate_taskset(args, len(pending), SetStreams.of_sets(
+                seed, pending, [attempts[index] for index in pending]), pending, failed)
+        except SystemExit:
+            # Do not let a worker process exit silently.
+            raise RuntimeError("task generator failed in block starting at set "
+                               + str(pending[0]))
+        unmapped += len(failed)
+        passed = filter_sets(args, task_sets)
+        if args['--partitioned']:
+            passed = passed & partition.fits(task_sets)
+        failed = set(failed)
+        rejected = []
+        try:
+            for index, ts, ok in zip(pending, task_sets, passed):
+                if ok and index not in failed \
+                        and hyperperiods.within_limits(ts, max_jobs, max_hyperperiod):
+                    save_taskset(index, ts)
+                else:
+                    rejected.append(index)
+        except Exception as e:
+            print(e)
+            raise RuntimeError("ERROR: save")
+        for index in rejected:
+            attempts[index] += 1
+            if attempts[index] > max_redraws:
+                raise RuntimeError("no task set %d within the mapping, the job limits, --filter and the PE loads after %d draws"
+                                   % (index, max_redraws))
+        pending = rejected
+    redraws = sum(attempts.values())
+    if unmapped:
+        print("\tDrew %d task sets again because they could not be mapped" % unmapped)
+    if redraws > unmapped:
+        print("\tDrew %d task sets again because of the job limits, --filter or the PE loads"
+              % (redraws - unmapped))
+    return len(indices)
+
+
+def filter_sets(args, task_sets):
+    """Whether each task set of a block passes --filter (all sets of the
+    block are tested at once). Unmapped sets run on PE 0."""
+    if args['--filter'] is None:
+        return [True] * len(task_sets)
+    method, preemptive = filter_policies[int(args['--policy'])]
+    if args['--filter'].startswith('global-'):
+        labels = global_tests.classify(task_sets, int(args['--npe']), method)
+        return labels == args['--filter'][len('global-'):]
+    if method == EDF:
+        return edf.schedulable(task_sets)
+    return rta.schedulable(task_sets, method, preemptive)
+
+
+def optional_int(value):
+    return None if value is None else int(value)
+
+
+def save_taskset(index, task_set):
+    """Write taskset-<index>.csv. The file is written under a temporary
+    name and renamed when complete, so an existing taskset file is always
+    complete."""
+    file_name = taskset_file(index)
+    task_array.write_csv(file_name + '.tmp', task_set)
+    os.replace(file_name + '.tmp', file_name)
+
+
+def taskset_file(index):
+    return 'taskset-' + str(index) + '.csv'
+
+
+def iter_blocks(args, indices, block, seed):
+    """Split the indices into blocks of at most `block` sets."""
+    for start in range(0, len(indices), block):
+        yield args, indices[start:start + block], seed
+
+
+def run_block(block_args):
+    return generate_block(*block_args)
 
-    while n_gen != int(args['--nset']):
-        task_set = generate_taskset(args)
-        n_gen += 1
-        task_sets.append(task_set[0])
-
-    ###
-    # Save data.
-    ###
-    print("= Save data =")
 
+def main():
+    args = docopt(__doc__, version='0.9.1')
+    n_set = int(args['--nset'])
+    block = int(args['--block'])
+    n_jobs = int(args['--jobs'])
+    if args['--seed'] is not None:
+        seed = int(args['--seed'])
+    elif args['--index'] is not None or args['--resume']:
+        print("ERROR: --index and --resume need the --seed of the experiment")
+        sys.exit(1)
+    else:
+        seed = np.random.SeedSequence().entropy
+    if args['--filter'] not in (None, 'schedulable', 'global-schedulable',
+                                'global-unknown', 'global-unschedulable') \
+            or int(args['--policy']) not in filter_policies:
+        print("ERROR: unknown --filter or --policy")
+        sys.exit(1)
+    if args['--filter'] is not None and args['--filter'].startswith('global-') \
+            and not filter_policies[int(args['--policy'])][1]:
+        print("ERROR: the global tests only cover preemptive policies")
+        sys.exit(1)
+    if args['--partitioned'] and (int(args['--generator']) != 1 or int(args['--mapping']) != 0):
+        print("ERROR: --partitioned maps the tasks itself; use it with generator 1 and without --mapping")
+        sys.exit(1)
+    print("Seed: " + str(seed))
+
+    if args['--index'] is not None:
+        # Regenerate one set of the experiment.
+        indices = range(int(args['--index']), int(args['--index']) + 1)
+    else:
+        indices = range(n_set)
+    if args['--resume']:
+        # Files are renamed into place when complete: skip the existing ones.
+        indices = [index for index in indices
+                   if not os.path.exists(taskset_file(index))]
+        print("Resume: %d task sets left" % len(indices))
+
+    # Ask the generator for many sets at once, so that its fixed costs
+    # are paid once per block and not once per set. Each block is saved as
+    # soon as it is generated, so memory does not grow with --nset.
+    blocks = iter_blocks(args, indices, block, seed)
     try:
-        for ts in task_sets:
-            header = ['Name', 'Jitter', 'BCET', 'WCET', 'Period', 'Deadline', 'PE']
-
-            with open('taskset-' + str(task_sets.index(ts)) + '.csv', 'w', encoding='UTF8') as f:
-                writer = csv.writer(f)
-
-                # write the header
-                writer.writerow(header)
-
-                for t in ts:
-                    writer.writerow(t.get_data(True))
-
-    except Exception as e:
-        print(e)
-        print("ERROR: save")
-        if debug_flag:
-            breakpoint()
+        if n_jobs > 1:
+            with multiprocessing.Pool(n_jobs) as pool:
+                for _ in pool.imap_unordered(run_block, blocks):
+                    pass
         else:
-            return
+            for block_args in blocks:
+                generate_block(*block_args)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
 
 
 if __name__ == '__main__':